@@ -9,27 +9,46 @@ from src import (
     ContextAssembler,
     ContextBlock,
     SessionCompressor,
+    SummaryCache,
+    AdaptiveTTL,
     should_cache_tool,
-    get_cache_ttl,
+    get_cache_ttl_seconds,
     get_confidence_threshold,
 )
+from src.cache_policy.policy_engine import get_policy_engine
 
 
 class OpenClawAgent:
     def __init__(self, project_name: str):
         # Memory components
-        self.neural_memory = NeuralMemoryLayer(project_name)
-        self.router = SmartMemoryRouter()
+        # write_behind: store_* calls return at once, persistence runs in background
+        # adaptive_ttl: stable tool results get cached longer, volatile ones less
+        # Thresholds and session settings follow memory_config.yaml edits without a restart
+        policy_engine = get_policy_engine()
+        self.neural_memory = NeuralMemoryLayer(
+            project_name, write_behind=True, adaptive_ttl=AdaptiveTTL(policy_engine)
+        )
+        self.router = SmartMemoryRouter(policy_engine=policy_engine)
         self.assembler = ContextAssembler(max_context_tokens=1500)
+        # background: summarization runs off the turn's critical path
         self.compressor = SessionCompressor(
             neural_memory=self.neural_memory,
             llm_call_fn=self._llm_call,  # Point to your LLM call
+            background=True,
+            # Retried/forked sessions reuse summaries instead of calling the LLM
+            summary_cache=SummaryCache(f".openclaw/{project_name}_summaries.db"),
+            policy_engine=policy_engine,
         )
         self.messages = []
 
     async def initialize(self):
         await self.neural_memory.initialize()
 
+    async def shutdown(self):
+        """Finish pending compression, flush buffered memories and close storage."""
+        await self.compressor.close()
+        await self.neural_memory.close()
+
     # ─── BEFORE TOOL CALL: check cache ──────────────────────────
 
     async def smart_tool_call(self, tool_name: str, args: dict) -> str:
@@ -38,28 +57,19 @@ class OpenClawAgent:
         1. Check NeuralMemory cache first
         2. If miss → call real tool
         3. Cache result for later use
+        Concurrent identical calls share one in-flight lookup → tool → store.
         """
-        # Step 1: Check if should cache
-        if should_cache_tool(tool_name):
-            threshold = get_confidence_threshold(tool_name)
-            cached = await self.neural_memory.get_cached_tool_result(
-                tool_name, args, min_confidence=threshold
-            )
-            if cached:
-                # Cache HIT — save 1 tool call
-                return cached
-
-        # Step 2: Cache MISS → call real tool
-        result = await self._actual_tool_call(tool_name, args)
-
-        # Step 3: Save to cache
-        ttl = get_cache_ttl(tool_name)
-        if ttl > 0:
-            await self.neural_memory.cache_tool_result(
-                tool_name, args, result, ttl_hours=ttl
-            )
-
-        return result
+        # Tools that must stay fresh (or have side effects) go straight through
+        if not should_cache_tool(tool_name):
+            return await self._actual_tool_call(tool_name, args)
+
+        return await self.neural_memory.get_or_call_tool(
+            tool_name,
+            args,
+            lambda: self._actual_tool_call(tool_name, args),
+            ttl_seconds=get_cache_ttl_seconds(tool_name),
+            min_confidence=get_confidence_threshold(tool_name),
+        )
 
     # ─── BEFORE LLM CALL: build optimal context ─────────────────
 
@@ -98,7 +108,7 @@ class OpenClawAgent:
         """Add message and auto-compress if needed."""
         self.messages.append({"role": role, "content": content})
         
-        # Auto-compress when messages exceed threshold
+        # Auto-compress when messages exceed the token threshold (returns at once)
         self.messages = await self.compressor.maybe_compress(self.messages)
 
     # ─── STORE IMPORTANT EVENTS ─────────────────────────────────
@@ -153,6 +163,8 @@ async def main():
     )
     print(f"Result: {result}")
 
+    await agent.shutdown()
+
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -12,6 +12,7 @@ Usage:
     nocl recall "query" --confidence 0.7 --depth 2
     nocl task "task description" --max-tokens 500
     nocl status
+    nocl gc --vacuum
     nocl init --project my-project
 """
 from __future__ import annotations
@@ -106,6 +107,18 @@ class NeuralOpenClawCLI:
         else:
             print("❌ No relevant context found")
 
+    # ─── Maintenance Commands ────────────────────────────────────
+
+    async def collect_garbage(self, batch_size: int = 100, max_batches: int = 10, vacuum: bool = False):
+        """Purge expired memories and compact the database."""
+        stats = await self.memory.collect_garbage(batch_size, max_batches, vacuum)
+        print(f"🧹 Garbage collection for: {self.project_name}")
+        print(f"Expired memories deleted: {stats.memories_deleted}")
+        print(f"Tool cache entries deleted: {stats.tool_cache_deleted}")
+        print(f"Bytes reclaimed: {stats.bytes_reclaimed}")
+        if stats.memories_deleted == batch_size * max_batches:
+            print("⚠️ Batch limit reached — run again to continue")
+
     # ─── Status Commands ─────────────────────────────────────────
 
     async def show_status(self):
@@ -137,6 +150,7 @@ Examples:
   nocl task "Implement caching layer" --max-tokens 800
   nocl cache read_file '{"path": "config.json"}' '{"key": "value"}' --ttl 2
   nocl status
+  nocl gc --vacuum
         """
     )
 
@@ -192,6 +206,12 @@ Examples:
     # Status command
     subparsers.add_parser("status", help="Show memory status")
 
+    # GC command
+    gc_parser = subparsers.add_parser("gc", help="Purge expired memories and compact DB")
+    gc_parser.add_argument("--batch-size", "-b", type=int, default=100, help="Memories per batch")
+    gc_parser.add_argument("--max-batches", "-m", type=int, default=10, help="Max batches per run")
+    gc_parser.add_argument("--vacuum", action="store_true", help="Vacuum DB after purge")
+
     args = parser.parse_args()
 
     if not args.command:
@@ -230,6 +250,10 @@ Examples:
             await cli.get_task_context(args.description, args.max_tokens)
         elif args.command == "status":
             await cli.show_status()
+        elif args.command == "gc":
+            await cli.collect_garbage(args.batch_size, args.max_batches, args.vacuum)
+
+        await cli.memory.close()
 
     asyncio.run(run_command())
 
@@ -3,23 +3,48 @@ Memory module for OpenClaw.
 Import and use in main agent.
 """
 from .assembler.assembler import ContextAssembler, ContextBlock
+from .assembler.incremental import AssembledContext, IncrementalAssembler
+from .assembler.tokenizer import BPETokenizer, CachedTokenizer, load_tokenizer
+from .cache_policy.adaptive_ttl import AdaptiveTTL
+from .cache_policy.cache_key import canonicalize_args, make_cache_key
 from .cache_policy.cache_policy import (
     get_cache_ttl,
+    get_cache_ttl_seconds,
     get_confidence_threshold,
     should_cache_tool,
 )
 from .neural_layer.neural_layer import NeuralMemoryLayer
+from .neural_layer.pool import NeuralMemoryPool
+from .neural_layer.write_buffer import MemoryRecord
+from .router.executor import ExecutionResult, RoutedMemoryExecutor
+from .router.learned_router import LearnedRouter
 from .router.router import MemorySource, SmartMemoryRouter
 from .session_compressor.session_compressor import SessionCompressor
+from .session_compressor.summary_cache import SummaryCache
 
 __all__ = [
     "NeuralMemoryLayer",
+    "MemoryRecord",
+    "NeuralMemoryPool",
     "SmartMemoryRouter",
+    "LearnedRouter",
+    "RoutedMemoryExecutor",
+    "ExecutionResult",
     "ContextAssembler",
     "ContextBlock",
+    "IncrementalAssembler",
+    "AssembledContext",
+    "BPETokenizer",
+    "CachedTokenizer",
+    "load_tokenizer",
     "SessionCompressor",
+    "SummaryCache",
     "MemorySource",
     "should_cache_tool",
     "get_cache_ttl",
+    "get_cache_ttl_seconds",
     "get_confidence_threshold",
+    "canonicalize_args",
+    "make_cache_key",
+    "AdaptiveTTL",
 ]
@@ -3,55 +3,285 @@ ContextAssembler: Aggregate context from multiple sources, optimize token budget
 """
 from __future__ import annotations
 
-from dataclasses import dataclass
+import math
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import TextIO
 
+from .dedup import dedup_blocks
+from .tokenizer import (  # noqa: F401 — truncate_at_sentence re-exported
+    HeuristicTokenizer,
+    Tokenizer,
+    truncate_at_sentence,
+    truncate_to_tokens,
+)
 
-@dataclass
+# Max DP table cells (blocks x budget buckets) for optimal packing
+_DP_MAX_CELLS = 200_000
+
+
+@dataclass(frozen=True, slots=True)
 class ContextBlock:
     source: str  # "neural", "traditional", "system"
     content: str
     priority: int  # 1=highest
-    token_estimate: int  # estimated number of tokens
+    token_estimate: int | None = None  # estimated number of tokens, None = count lazily
+    confidence: float = 1.0  # recall confidence (0-1)
+    timestamp: float | None = None  # unix time the content was produced, None = timeless
+    # Lazily counted tokens as (tokenizer, count), see ContextAssembler.block_tokens
+    _token_count: tuple[Tokenizer, int] | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    # Lazily computed MinHash sketch as (num_hashes, sketch, LSH keys), see dedup.block_signature
+    _signature: tuple[int, frozenset[int], tuple[int, ...]] | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
 
 
 class ContextAssembler:
     """
     Gather context from multiple sources and cut by token budget.
     Priority: System > Neural (high confidence) > Traditional > Neural (low confidence)
+    Near-duplicate blocks (same fact from neural, RAG and session summary) are
+    dropped first, keeping the highest-priority copy.
+
+    Strategies:
+    - "greedy": take blocks in priority order, stop at the first one that does not fit
+    - "optimal": choose the set of blocks with the highest total value that fits
+      (value = priority x confidence x recency), 0/1 knapsack
     """
 
-    def __init__(self, max_context_tokens: int = 1500):
+    def __init__(
+        self,
+        max_context_tokens: int = 1500,
+        strategy: str = "greedy",
+        recency_half_life_hours: float = 24.0,
+        tokenizer: Tokenizer | None = None,
+        dedup_threshold: float | None = 0.8,
+    ):
+        """
+        Args:
+            max_context_tokens: Token budget for assembled context
+            strategy: "greedy" or "optimal"
+            recency_half_life_hours: Age at which a block's value halves ("optimal" only)
+            tokenizer: Token counter (default: ~4 chars/token heuristic)
+            dedup_threshold: Similarity at which blocks count as near-duplicates;
+                only the highest-priority copy is kept (None = no dedup)
+        """
+        if strategy not in ("greedy", "optimal"):
+            raise ValueError(f"Unknown strategy: {strategy}")
         self.max_context_tokens = max_context_tokens
+        self.strategy = strategy
+        self.recency_half_life_hours = recency_half_life_hours
+        self.tokenizer = tokenizer or HeuristicTokenizer()
+        self.dedup_threshold = dedup_threshold
+        self._header_token_counts: dict[str, int] = {}
 
-    def assemble(self, blocks: list[ContextBlock]) -> str:
+    def assemble(self, blocks: list[ContextBlock], max_tokens: int | None = None) -> str:
         """
         Sort blocks by priority, cut when reaching token budget.
 
+        Args:
+            blocks: Candidate context blocks
+            max_tokens: Budget for this call (default: max_context_tokens)
+
         Returns:
             Context string optimized, ready to inject into prompt.
         """
+        return "".join(self.assemble_segments(blocks, max_tokens))
+
+    def assemble_segments(
+        self, blocks: list[ContextBlock], max_tokens: int | None = None
+    ) -> list[str]:
+        """
+        Like assemble(), but return the pieces of the context in order.
+        Block contents are referenced, not copied: join or write them once.
+        """
+        if self.dedup_threshold is not None:
+            blocks = dedup_blocks(blocks, self.dedup_threshold)
+        budget = self.max_context_tokens if max_tokens is None else max_tokens
+        self._count_tokens(blocks)
+
+        if self.strategy == "optimal":
+            return self._segments_optimal(blocks, budget)
+
         # Sort by priority (1 = highest)
         sorted_blocks = sorted(blocks, key=lambda b: b.priority)
-        
-        result_parts = []
+
+        segments: list[str] = []
         total_tokens = 0
 
         for block in sorted_blocks:
-            if total_tokens + block.token_estimate > self.max_context_tokens:
-                remaining = self.max_context_tokens - total_tokens
+            tokens = self.block_tokens(block)
+            if total_tokens + tokens > budget:
+                remaining = budget - total_tokens
                 if remaining > 50:  # Only add if enough space left
-                    chars = remaining * 4
-                    result_parts.append(
-                        f"[{block.source.upper()}] {block.content[:chars]}... [truncated]"
-                    )
+                    self._append(segments, block, truncate_to=remaining)
                 break
 
-            result_parts.append(f"[{block.source.upper()}] {block.content}")
-            total_tokens += block.token_estimate
+            self._append(segments, block)
+            total_tokens += tokens
+
+        return segments
+
+    def assemble_into(
+        self, buffer: TextIO, blocks: list[ContextBlock], max_tokens: int | None = None
+    ) -> int:
+        """
+        Write the context into a shared buffer (e.g. io.StringIO holding the prompt).
+
+        Returns:
+            Number of characters written.
+        """
+        segments = self.assemble_segments(blocks, max_tokens)
+        buffer.writelines(segments)
+        return sum(map(len, segments))
 
-        return " ".join(result_parts)
+    def block_value(self, block: ContextBlock, now: float | None = None) -> float:
+        """Value of including a block: priority x confidence x recency."""
+        value = block.confidence / max(1, block.priority)
+        if block.timestamp is not None:
+            age_hours = max(0.0, ((now or time.time()) - block.timestamp) / 3600)
+            value *= 0.5 ** (age_hours / self.recency_half_life_hours)
+        return value
+
+    def estimate_tokens(self, text: str) -> int:
+        """Number of tokens in text, per the assembler's tokenizer."""
+        return self.tokenizer.count(text)
+
+    def block_tokens(self, block: ContextBlock) -> int:
+        """
+        Token count of a block's content: its token_estimate, else counted and
+        cached on the block. The cache is tagged with the tokenizer, so
+        assemblers with different tokenizers sharing a block never use each
+        other's counts.
+        """
+        if block.token_estimate is not None:
+            return block.token_estimate
+        cached = block._token_count
+        if cached is not None and cached[0] is self.tokenizer:
+            return cached[1]
+        count = self.tokenizer.count(block.content)
+        object.__setattr__(block, "_token_count", (self.tokenizer, count))
+        return count
+
+    def make_blocks(
+        self, items: list[tuple[str, str, int]]
+    ) -> list[ContextBlock]:
+        """Build blocks from (source, content, priority), counting tokens in one batch."""
+        counts = self.tokenizer.count_many([content for _, content, _ in items])
+        return [
+            ContextBlock(source=source, content=content, priority=priority, token_estimate=count)
+            for (source, content, priority), count in zip(items, counts)
+        ]
+
+    # ─── Optimal Packing ────────────────────────────────────────
+
+    def _segments_optimal(self, blocks: list[ContextBlock], budget: int) -> list[str]:
+        now = time.time()
+        values = [self.block_value(b, now) for b in blocks]
+        costs = [self.block_tokens(b) + self._header_tokens(b) for b in blocks]
+
+        chosen = self._knapsack(values, costs, budget)
+        used = sum(costs[i] for i in chosen)
+
+        # Last resort: truncate the most valuable block left out into leftover space
+        remaining = budget - used
+        truncated = None
+        if remaining > 50:
+            left_out = [i for i in range(len(blocks)) if i not in chosen]
+            if left_out:
+                truncated = max(left_out, key=lambda i: values[i])
+                chosen.add(truncated)
+
+        segments: list[str] = []
+        for i in sorted(chosen, key=lambda i: (blocks[i].priority, i)):
+            if i == truncated:
+                self._append(
+                    segments, blocks[i], truncate_to=remaining - self._header_tokens(blocks[i])
+                )
+            else:
+                self._append(segments, blocks[i])
+        return segments
 
     @staticmethod
-    def estimate_tokens(text: str) -> int:
-        """Estimate number of tokens (~4 chars = 1 token for English/code)."""
-        return max(1, len(text) // 4)
+    def _knapsack(values: list[float], costs: list[int], budget: int) -> set[int]:
+        """
+        0/1 knapsack: indices maximizing total value with total cost <= budget.
+        Exact DP over a bucketed budget; greedy by value density for huge inputs.
+        """
+        n = len(values)
+        fits = [i for i in range(n) if costs[i] <= budget]
+        if sum(costs[i] for i in fits) <= budget:
+            return set(fits)
+
+        # Bucket costs (rounding up, so the chosen set always fits the real budget)
+        granularity = max(1, math.ceil(len(fits) * budget / _DP_MAX_CELLS))
+        if granularity > budget // 4:
+            chosen, used = set(), 0
+            for i in sorted(fits, key=lambda i: values[i] / max(1, costs[i]), reverse=True):
+                if used + costs[i] <= budget:
+                    chosen.add(i)
+                    used += costs[i]
+            return chosen
+
+        capacity = budget // granularity
+        weights = {i: math.ceil(costs[i] / granularity) for i in fits}
+        best = [0.0] * (capacity + 1)
+        taken: list[bytearray] = []
+        for i in fits:
+            w, v = weights[i], values[i]
+            take = bytearray(capacity + 1)
+            for c in range(capacity, w - 1, -1):
+                candidate = best[c - w] + v
+                if candidate > best[c]:
+                    best[c] = candidate
+                    take[c] = 1
+            taken.append(take)
+
+        chosen, c = set(), capacity
+        for i, take in zip(reversed(fits), reversed(taken)):
+            if take[c]:
+                chosen.add(i)
+                c -= weights[i]
+        return chosen
+
+    # ─── Helpers ────────────────────────────────────────────────
+
+    def _header_tokens(self, block: ContextBlock) -> int:
+        count = self._header_token_counts.get(block.source)
+        if count is None:
+            count = self.estimate_tokens(block_header(block.source))
+            self._header_token_counts[block.source] = count
+        return count
+
+    def _count_tokens(self, blocks: list[ContextBlock]) -> None:
+        """Count all uncounted blocks in one tokenizer batch."""
+        pending = [
+            b for b in blocks
+            if b.token_estimate is None
+            and (b._token_count is None or b._token_count[0] is not self.tokenizer)
+        ]
+        if pending:
+            counts = self.tokenizer.count_many([b.content for b in pending])
+            for block, count in zip(pending, counts):
+                object.__setattr__(block, "_token_count", (self.tokenizer, count))
+
+    def _append(
+        self, segments: list[str], block: ContextBlock, truncate_to: int | None = None
+    ) -> None:
+        if segments:
+            segments.append(" ")
+        segments.append(block_header(block.source))
+        if truncate_to is None:
+            segments.append(block.content)
+        else:
+            segments.append(truncate_to_tokens(block.content, truncate_to, self.tokenizer))
+            segments.append("... [truncated]")
+
+
+@lru_cache(maxsize=256)
+def block_header(source: str) -> str:
+    """Label prefixed to a block's content, e.g. "[NEURAL] "."""
+    return f"[{source.upper()}] "
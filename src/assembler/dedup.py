@@ -0,0 +1,109 @@
+"""
+Near-duplicate detection for context blocks.
+Bottom-k MinHash over word shingles: one hash per shingle, Jaccard estimated from sketches.
+Sketches are cached on the blocks. Candidate pairs come from LSH buckets keyed by each sketch's
+smallest hashes, so only blocks likely to be near-duplicates are compared.
+"""
+from __future__ import annotations
+
+import string
+from collections import defaultdict
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .assembler import ContextBlock
+
+# ASCII punctuation → space, so words split like \w+ (str.translate is ~3x faster than re)
+_PUNCTUATION = str.maketrans(dict.fromkeys(string.punctuation.replace("_", ""), " "))
+
+# Smallest sketch hashes used as LSH bucket keys. The minimum hash of A ∪ B is
+# shared by A and B with probability J(A, B), so a pair at similarity J shares
+# none of these keys with probability about (1 - J) ** LSH_KEYS (3e-6 at J = 0.8).
+LSH_KEYS = 8
+
+
+def shingles(text: str, size: int = 3) -> set[int]:
+    """
+    Hashed word n-grams of text (the whole text if it has fewer words).
+    Uses the built-in tuple hash: stable within a process only, so sketches
+    must not be persisted.
+    """
+    words = text.lower().translate(_PUNCTUATION).split()
+    if len(words) <= size:
+        return {hash(tuple(words))}
+    return set(map(hash, zip(*(words[i:] for i in range(size)))))
+
+
+def minhash_signature(text: str, num_hashes: int = 64, shingle_size: int = 3) -> frozenset[int]:
+    """Bottom-k MinHash sketch: the num_hashes smallest shingle hashes."""
+    return frozenset(sorted(shingles(text, shingle_size))[:num_hashes])
+
+
+def block_signature(
+    block: ContextBlock, num_hashes: int = 64
+) -> tuple[frozenset[int], tuple[int, ...]]:
+    """
+    MinHash sketch of a block's content and its LSH bucket keys,
+    computed once and cached on the block.
+    """
+    cached = block._signature
+    if cached is not None and cached[0] == num_hashes:
+        return cached[1], cached[2]
+    hashes = sorted(shingles(block.content))[:num_hashes]
+    signature, keys = frozenset(hashes), tuple(hashes[:LSH_KEYS])
+    object.__setattr__(block, "_signature", (num_hashes, signature, keys))
+    return signature, keys
+
+
+def estimate_jaccard(a: frozenset[int], b: frozenset[int], num_hashes: int = 64) -> float:
+    """Estimated Jaccard similarity of the texts behind two sketches."""
+    if not a or not b:
+        return 0.0
+    union = sorted(a | b)[:num_hashes]
+    return len((a & b).intersection(union)) / len(union)
+
+
+def dedup_blocks(
+    blocks: list[ContextBlock],
+    threshold: float = 0.8,
+    num_hashes: int = 64,
+) -> list[ContextBlock]:
+    """
+    Drop near-duplicate blocks, keeping the highest-priority copy
+    (then the most confident, then the first). Input order is preserved.
+
+    Args:
+        blocks: Candidate context blocks
+        threshold: Estimated Jaccard similarity at which blocks are duplicates
+        num_hashes: MinHash sketch size
+    """
+    if len(blocks) < 2:
+        return list(blocks)
+
+    ranked = sorted(range(len(blocks)), key=lambda i: (blocks[i].priority, -blocks[i].confidence, i))
+    kept: list[int] = []
+    kept_signatures: list[frozenset[int]] = []
+    # LSH key → positions in kept; only kept blocks sharing a bucket are compared
+    buckets: defaultdict[int, list[int]] = defaultdict(list)
+    for i in ranked:
+        signature, keys = block_signature(blocks[i], num_hashes)
+        candidates = {j for key in keys if key in buckets for j in buckets[key]}
+        if any(
+            _is_duplicate(signature, kept_signatures[j], threshold, num_hashes)
+            for j in candidates
+        ):
+            continue
+        for key in keys:
+            buckets[key].append(len(kept))
+        kept.append(i)
+        kept_signatures.append(signature)
+
+    return [blocks[i] for i in sorted(kept)]
+
+
+def _is_duplicate(a: frozenset[int], b: frozenset[int], threshold: float, num_hashes: int) -> bool:
+    # Shared hashes bound the estimate from above; skip the sort for clear misses
+    shared = len(a & b)
+    if shared < threshold * min(num_hashes, len(a) + len(b) - shared):
+        return False
+    return estimate_jaccard(a, b, num_hashes) >= threshold
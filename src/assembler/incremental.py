@@ -0,0 +1,133 @@
+"""
+IncrementalAssembler: Persistent context across turns with a byte-stable prefix.
+Stable blocks are appended to a fixed prefix (provider prompt cache hits); volatile blocks go last.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+from .assembler import ContextAssembler, ContextBlock, block_header
+from .dedup import dedup_blocks
+from .tokenizer import Tokenizer
+
+
+@dataclass
+class _PrefixEntry:
+    key: tuple[str, str]  # (source, content)
+    segment: str  # rendered "[SOURCE] content"
+    tokens: int
+
+
+@dataclass
+class AssembledContext:
+    prefix: str  # Stable part, byte-identical across turns until a stable block leaves
+    suffix: str  # Volatile part, rebuilt every turn
+    segments: list[str]  # Prefix segments in order
+    reused_segments: int  # Leading prefix segments unchanged since the previous turn
+    added: list[str] = field(default_factory=list)  # Segments appended to the prefix
+    removed: list[str] = field(default_factory=list)  # Segments dropped from the prefix
+
+    @property
+    def text(self) -> str:
+        return " ".join(part for part in (self.prefix, self.suffix) if part)
+
+    @property
+    def prefix_changed(self) -> bool:
+        """True if the previous prefix is no longer a prefix of this one."""
+        return bool(self.removed)
+
+
+class IncrementalAssembler:
+    """
+    Append-mostly context for repeated LLM calls.
+
+    Flow:
+    1. Near-duplicate blocks are dropped (highest-priority copy kept)
+    2. Stable blocks (priority <= stable_priority, e.g. system rules and decisions)
+       keep their position in the prefix; new ones are appended at its end
+    3. A stable block that is no longer supplied is removed; everything after it
+       shifts, so the prefix is only reusable up to that point
+    4. Volatile blocks fill the remaining budget after the prefix, via ContextAssembler
+    """
+
+    def __init__(
+        self,
+        max_context_tokens: int = 1500,
+        stable_priority: int = 1,
+        max_prefix_tokens: int | None = None,
+        strategy: str = "greedy",
+        tokenizer: Tokenizer | None = None,
+        dedup_threshold: float | None = 0.8,
+    ):
+        """
+        Args:
+            max_context_tokens: Token budget for prefix + volatile suffix
+            stable_priority: Blocks with priority <= this go to the stable prefix
+            max_prefix_tokens: Budget for the prefix (default: 2/3 of the total);
+                stable blocks that do not fit are treated as volatile
+            strategy: Packing strategy for the volatile suffix ("greedy" or "optimal")
+            tokenizer: Token counter (default: ~4 chars/token heuristic)
+            dedup_threshold: Near-duplicate similarity threshold (None = no dedup)
+        """
+        self.max_context_tokens = max_context_tokens
+        self.stable_priority = stable_priority
+        self.max_prefix_tokens = (
+            max_context_tokens * 2 // 3 if max_prefix_tokens is None else max_prefix_tokens
+        )
+        self.dedup_threshold = dedup_threshold
+        # Dedup runs here, across prefix and suffix, not per part
+        self._tail = ContextAssembler(
+            max_context_tokens, strategy=strategy, tokenizer=tokenizer, dedup_threshold=None
+        )
+        self._prefix: list[_PrefixEntry] = []
+
+    def update(self, blocks: list[ContextBlock]) -> AssembledContext:
+        """Assemble this turn's context, keeping the prefix from previous turns stable."""
+        if self.dedup_threshold is not None:
+            blocks = dedup_blocks(blocks, self.dedup_threshold)
+
+        stable = {
+            (b.source, b.content): b for b in blocks if b.priority <= self.stable_priority
+        }
+
+        # Keep surviving prefix entries in place
+        kept = [e for e in self._prefix if e.key in stable]
+        removed = [e.segment for e in self._prefix if e.key not in stable]
+        reused = next(
+            (i for i, (old, new) in enumerate(zip(self._prefix, kept)) if old is not new),
+            min(len(self._prefix), len(kept)),
+        )
+
+        # Append new stable blocks, in priority order, while the prefix budget allows
+        used = sum(e.tokens for e in kept)
+        in_prefix = {e.key for e in kept}
+        added, volatile = [], []
+        for block in sorted(blocks, key=lambda b: b.priority):
+            key = (block.source, block.content)
+            if key in in_prefix:
+                continue
+            tokens = self._tail.block_tokens(block) + self._tail._header_tokens(block)
+            if key in stable and used + tokens <= self.max_prefix_tokens:
+                entry = _PrefixEntry(key, block_header(block.source) + block.content, tokens)
+                kept.append(entry)
+                in_prefix.add(key)
+                added.append(entry.segment)
+                used += tokens
+            else:
+                volatile.append(block)
+
+        self._prefix = kept
+        suffix = self._tail.assemble(volatile, max_tokens=self.max_context_tokens - used)
+        segments = [e.segment for e in kept]
+        return AssembledContext(
+            prefix=" ".join(segments),
+            suffix=suffix,
+            segments=segments,
+            reused_segments=reused,
+            added=added,
+            removed=removed,
+        )
+
+    def reset(self) -> None:
+        """Forget the prefix (e.g. new session)."""
+        self._prefix = []
@@ -0,0 +1,168 @@
+"""
+Token counting for context budgets.
+Pluggable tokenizers: offline byte-level BPE (tiktoken-format vocab file) with the
+~4 chars/token heuristic as fallback, plus a memoizing wrapper keyed by content hash.
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import re
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Protocol
+
+# Sentence end (or line break) followed by whitespace — preferred truncation point
+_SENTENCE_END = re.compile(r"[.!?](?=\s)|\n")
+
+# GPT-style pre-tokenization (contractions, words, numbers, punctuation, spaces)
+_PRETOKENIZE = re.compile(
+    r"'(?:[sdmt]|ll|ve|re)| ?[^\W\d_]+| ?\d{1,3}| ?[^\s\w]+|\s+(?!\S)|\s+"
+)
+
+
+class Tokenizer(Protocol):
+    def count(self, text: str) -> int:
+        """Number of tokens in text."""
+
+    def count_many(self, texts: list[str]) -> list[int]:
+        """Number of tokens for each text, in order."""
+
+
+class HeuristicTokenizer:
+    """~4 chars = 1 token for English/code. No vocab needed."""
+
+    def count(self, text: str) -> int:
+        return max(1, len(text) // 4)
+
+    def count_many(self, texts: list[str]) -> list[int]:
+        return [max(1, len(text) // 4) for text in texts]
+
+
+class BPETokenizer:
+    """
+    Byte-level BPE token counter, fully offline.
+
+    Vocab file format (tiktoken): one `<base64 token bytes> <rank>` per line.
+    Lower rank = merged earlier.
+    """
+
+    def __init__(self, ranks: dict[bytes, int], piece_cache_size: int = 65536):
+        self._ranks = ranks
+        self._count_piece = lru_cache(maxsize=piece_cache_size)(self._bpe_length)
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "BPETokenizer":
+        ranks = {}
+        with open(path, "rb") as f:
+            for line in f:
+                if line.strip():
+                    token, rank = line.split()
+                    ranks[base64.b64decode(token)] = int(rank)
+        return cls(ranks, **kwargs)
+
+    def count(self, text: str) -> int:
+        return sum(self._count_piece(piece) for piece in _PRETOKENIZE.findall(text))
+
+    def count_many(self, texts: list[str]) -> list[int]:
+        return [self.count(text) for text in texts]
+
+    def _bpe_length(self, piece: str) -> int:
+        data = piece.encode("utf-8")
+        if data in self._ranks:
+            return 1
+        parts = [data[i:i + 1] for i in range(len(data))]
+        while len(parts) > 1:
+            best_rank, best_i = None, -1
+            for i in range(len(parts) - 1):
+                rank = self._ranks.get(parts[i] + parts[i + 1])
+                if rank is not None and (best_rank is None or rank < best_rank):
+                    best_rank, best_i = rank, i
+            if best_rank is None:
+                break
+            parts[best_i:best_i + 2] = [parts[best_i] + parts[best_i + 1]]
+        return len(parts)
+
+
+class CachedTokenizer:
+    """
+    Memoize token counts per content hash, so the same memory is not
+    re-tokenized every turn. Bounded LRU: the least recently used count is
+    evicted first.
+    """
+
+    def __init__(self, base: Tokenizer, max_entries: int = 10000):
+        self.base = base
+        self.max_entries = max_entries
+        self._counts: OrderedDict[bytes, int] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def count(self, text: str) -> int:
+        return self.count_many([text])[0]
+
+    def count_many(self, texts: list[str]) -> list[int]:
+        """Count a batch; only uncached texts go to the base tokenizer, in one call."""
+        keys = [hashlib.blake2b(t.encode(), digest_size=16).digest() for t in texts]
+        counts: list[int | None] = [self._counts.get(k) for k in keys]
+
+        # Unique uncached texts, first occurrence wins; hits become most recent
+        missing: dict[bytes, int] = {}
+        for i, (key, c) in enumerate(zip(keys, counts)):
+            if c is None:
+                missing.setdefault(key, i)
+            else:
+                self._counts.move_to_end(key)
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            fresh = self.base.count_many([texts[i] for i in missing.values()])
+            self._counts.update(zip(missing, fresh))
+            while len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+            by_key = dict(zip(missing, fresh))
+            counts = [by_key[k] if c is None else c for k, c in zip(keys, counts)]
+        return counts
+
+
+def load_tokenizer(vocab_path: str | None = None) -> Tokenizer:
+    """Cached BPE tokenizer if a vocab file is given, heuristic otherwise."""
+    if vocab_path is None:
+        return HeuristicTokenizer()
+    return CachedTokenizer(BPETokenizer.from_file(vocab_path))
+
+
+# ─── Truncation ─────────────────────────────────────────────────
+
+
+def truncate_at_sentence(text: str, max_chars: int) -> str:
+    """
+    Cut text to max_chars, preferring the last sentence boundary,
+    then the last word boundary, within the limit.
+    """
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    ends = [m.end() for m in _SENTENCE_END.finditer(cut)]
+    if ends and ends[-1] >= max_chars // 2:
+        return cut[:ends[-1]].rstrip()
+    space = cut.rfind(" ")
+    if space >= max_chars // 2:
+        return cut[:space]
+    return cut
+
+
+def truncate_to_tokens(text: str, max_tokens: int, tokenizer: Tokenizer) -> str:
+    """Cut text (at a sentence boundary when possible) to at most max_tokens."""
+    if max_tokens <= 0:
+        return ""
+    tokens = tokenizer.count(text)
+    if tokens <= max_tokens:
+        return text
+    chars = len(text) * max_tokens // tokens
+    while chars > 0:
+        cut = truncate_at_sentence(text, chars)
+        if tokenizer.count(cut) <= max_tokens:
+            return cut
+        chars = chars * 9 // 10
+    return ""
@@ -0,0 +1,108 @@
+"""
+AdaptiveTTL: Tune tool cache TTLs from observed result volatility.
+Each re-fetch is compared (by content hash) with the previous result for the same tool + args.
+"""
+from __future__ import annotations
+
+import hashlib
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from .policy_engine import DEFAULT_MAX_TTL_SECONDS, DEFAULT_MIN_TTL_SECONDS
+
+if TYPE_CHECKING:
+    from .policy_engine import PolicyEngine
+
+
+@dataclass(slots=True)
+class _KeyState:
+    content_hash: bytes
+    ttl_seconds: float
+
+
+class AdaptiveTTL:
+    """
+    Per (tool, args) cache key TTL that follows how often the result changes.
+
+    Flow:
+    1. First fetch of a key → the configured TTL
+    2. Re-fetch (cache expired) with the same content → TTL x grow (stable, cache longer)
+    3. Re-fetch with different content → TTL x shrink (volatile, cache less)
+    4. TTLs stay within the tool's [min_ttl_seconds, max_ttl_seconds] bounds
+    """
+
+    def __init__(
+        self,
+        engine: PolicyEngine | None = None,
+        min_ttl_seconds: float = DEFAULT_MIN_TTL_SECONDS,
+        max_ttl_seconds: float = DEFAULT_MAX_TTL_SECONDS,
+        grow: float = 2.0,
+        shrink: float = 0.5,
+        max_keys: int = 10000,
+    ):
+        """
+        Args:
+            engine: Policy engine for per-tool bounds (None = the bounds below)
+            min_ttl_seconds: Lower TTL bound
+            max_ttl_seconds: Upper TTL bound
+            grow: TTL multiplier when a re-fetched result is unchanged
+            shrink: TTL multiplier when a re-fetched result changed
+            max_keys: Max cache keys tracked (least recently observed dropped)
+        """
+        self.engine = engine
+        self.min_ttl_seconds = min_ttl_seconds
+        self.max_ttl_seconds = max_ttl_seconds
+        self.grow = grow
+        self.shrink = shrink
+        self.max_keys = max_keys
+        self._keys: OrderedDict[str, _KeyState] = OrderedDict()
+        self._refetches: defaultdict[str, int] = defaultdict(int)
+        self._changes: defaultdict[str, int] = defaultdict(int)
+
+    def observe(self, tool_name: str, cache_key: str, result: str, ttl_seconds: float) -> float:
+        """
+        Record a fresh result and return the TTL to cache it with.
+
+        Args:
+            tool_name: Tool name (for bounds and per-tool stats)
+            cache_key: Cache key of (tool_name, args)
+            result: Fresh tool result
+            ttl_seconds: Configured TTL, used for keys seen the first time
+        """
+        low, high = self._bounds(tool_name)
+        content_hash = hashlib.blake2b(result.encode(), digest_size=16).digest()
+
+        state = self._keys.get(cache_key)
+        if state is None:
+            ttl = ttl_seconds
+        else:
+            self._refetches[tool_name] += 1
+            if state.content_hash == content_hash:
+                ttl = state.ttl_seconds * self.grow
+            else:
+                self._changes[tool_name] += 1
+                ttl = state.ttl_seconds * self.shrink
+        ttl = min(high, max(low, ttl))
+
+        self._keys[cache_key] = _KeyState(content_hash, ttl)
+        self._keys.move_to_end(cache_key)
+        while len(self._keys) > self.max_keys:
+            self._keys.popitem(last=False)
+        return ttl
+
+    def ttl_for(self, cache_key: str) -> float | None:
+        """Current adapted TTL of a key, None if never observed."""
+        state = self._keys.get(cache_key)
+        return state.ttl_seconds if state is not None else None
+
+    def change_rate(self, tool_name: str) -> float:
+        """Fraction of re-fetches of this tool that returned changed content."""
+        refetches = self._refetches.get(tool_name, 0)
+        return self._changes.get(tool_name, 0) / refetches if refetches else 0.0
+
+    def _bounds(self, tool_name: str) -> tuple[float, float]:
+        if self.engine is None:
+            return self.min_ttl_seconds, self.max_ttl_seconds
+        policy = self.engine.lookup(tool_name)
+        return policy.min_ttl_seconds, policy.max_ttl_seconds
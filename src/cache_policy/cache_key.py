@@ -0,0 +1,77 @@
+"""
+Canonical tool-argument hashing for the tool result cache.
+Equivalent tool calls (reordered keys, equivalent paths, ignored args) share one cache key.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import posixpath
+from typing import Any
+
+# File tools whose path-like arguments are normalized
+FILE_TOOLS = {
+    "read_file",
+    "list_directory",
+    "get_file_content",
+}
+
+# Argument names treated as filesystem paths for FILE_TOOLS
+PATH_ARGS = {"path", "file_path", "filepath", "file", "directory", "dir"}
+
+# Arguments that do not affect the tool result (by tool type)
+IGNORED_ARGS: dict[str, set[str]] = {
+    "default": {"timeout", "request_id", "trace_id"},
+    "fetch_url": {"user_agent"},
+    "search_web": {"user_agent"},
+}
+
+
+def canonicalize_args(tool_name: str, args: dict[str, Any] | str) -> str:
+    """
+    Return the canonical string form of tool arguments.
+
+    Dicts are serialized with sorted keys and without ignored args; path args
+    of file tools are normalized. JSON strings are parsed and treated as dicts,
+    other strings are only stripped.
+    """
+    if isinstance(args, str):
+        try:
+            parsed = json.loads(args)
+        except ValueError:
+            return args.strip()
+        if not isinstance(parsed, dict):
+            return args.strip()
+        args = parsed
+
+    ignored = IGNORED_ARGS["default"] | IGNORED_ARGS.get(tool_name, set())
+    normalized = {}
+    for key, value in args.items():
+        if key in ignored:
+            continue
+        if tool_name in FILE_TOOLS and key in PATH_ARGS and isinstance(value, str):
+            value = _normalize_path(value)
+        normalized[key] = value
+
+    return json.dumps(
+        normalized,
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+
+
+def hash_cache_key(tool_name: str, canonical_args: str) -> str:
+    """Hash a tool name and canonical args string into a stable cache key."""
+    raw = f"{tool_name}\x00{canonical_args}"
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+def make_cache_key(tool_name: str, args: dict[str, Any] | str) -> str:
+    """Get cache key for a tool call."""
+    return hash_cache_key(tool_name, canonicalize_args(tool_name, args))
+
+
+def _normalize_path(path: str) -> str:
+    return posixpath.normpath(path.strip().replace("\\", "/"))
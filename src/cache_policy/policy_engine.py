@@ -0,0 +1,216 @@
+"""
+PolicyEngine: Compile memory_config.yaml into an immutable cache policy, hot-reloaded on change.
+Per-call lookups are dict hits; glob/regex tool rules are resolved once per tool name.
+"""
+from __future__ import annotations
+
+import fnmatch
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Mapping
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG_PATH = str(Path(__file__).parent.parent / "config" / "memory_config.yaml")
+
+# Used when the config does not set tool_cache.default_confidence
+DEFAULT_CONFIDENCE = 0.80
+
+# Adaptive TTL bounds (seconds) when the config does not set tool_cache.adaptive
+DEFAULT_MIN_TTL_SECONDS = 60.0
+DEFAULT_MAX_TTL_SECONDS = 24 * 3600.0
+
+# Max tool names whose rule resolution is memoized per policy; names beyond it
+# are resolved on every lookup
+MAX_RESOLVED_NAMES = 4096
+
+
+@dataclass(frozen=True, slots=True)
+class ToolPolicy:
+    cacheable: bool
+    ttl_seconds: float  # 0 when not cacheable
+    confidence: float  # Min confidence to accept a cached result
+    min_ttl_seconds: float = DEFAULT_MIN_TTL_SECONDS  # Adaptive TTL bounds
+    max_ttl_seconds: float = DEFAULT_MAX_TTL_SECONDS
+
+    @property
+    def ttl_hours(self) -> float:
+        return self.ttl_seconds / 3600
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """
+    Compiled, read-only view of one version of the config file.
+    Replaced as a whole on reload, never mutated (apart from the bounded
+    rule-resolution memo).
+
+    Hot-reloadable sections and their readers:
+    - tool_cache: cache_policy functions, AdaptiveTTL
+    - session: SessionCompressor(policy_engine=...)
+    - routing: SmartMemoryRouter / LearnedRouter(policy_engine=...)
+    """
+
+    tools: Mapping[str, ToolPolicy]
+    rules: tuple[tuple[re.Pattern, ToolPolicy], ...]
+    default: ToolPolicy  # Tools matching no entry or rule (default TTL)
+    enabled: bool
+    max_result_chars: int
+    session: Mapping[str, Any]
+    routing: Mapping[str, Any]
+    # Memoized rule resolution per tool name (derived data only)
+    _resolved: dict[str, ToolPolicy] = field(default_factory=dict, repr=False, compare=False)
+
+    def lookup(self, tool_name: str) -> ToolPolicy:
+        """Policy for a tool: exact entry, else first matching rule, else default."""
+        policy = self.tools.get(tool_name)
+        if policy is not None:
+            return policy
+        policy = self._resolved.get(tool_name)
+        if policy is None:
+            policy = next(
+                (p for pattern, p in self.rules if pattern.fullmatch(tool_name)), self.default
+            )
+            if len(self._resolved) < MAX_RESOLVED_NAMES:
+                self._resolved[tool_name] = policy
+        return policy
+
+    @classmethod
+    def compile(cls, config: Mapping[str, Any] | None) -> "CachePolicy":
+        """Build the lookup structures from parsed YAML."""
+        config = config or {}
+        section = config.get("tool_cache") or {}
+        enabled = bool(section.get("enabled", True))
+        never_cache = set(section.get("never_cache") or ())
+        default_confidence = float(section.get("default_confidence", DEFAULT_CONFIDENCE))
+        default_ttl = _ttl_seconds(section, prefix="default_", fallback=0.0)
+        adaptive = section.get("adaptive") or {}
+        default_min = float(adaptive.get("min_ttl_seconds", DEFAULT_MIN_TTL_SECONDS))
+        default_max = float(adaptive.get("max_ttl_seconds", DEFAULT_MAX_TTL_SECONDS))
+
+        def _policy(spec: Mapping[str, Any], name: str | None = None) -> ToolPolicy:
+            ttl = _ttl_seconds(spec, fallback=default_ttl)
+            cacheable = enabled and ttl > 0 and name not in never_cache
+            return ToolPolicy(
+                cacheable=cacheable,
+                ttl_seconds=ttl if cacheable else 0,
+                confidence=float(spec.get("confidence", default_confidence)),
+                min_ttl_seconds=float(spec.get("min_ttl_seconds", default_min)),
+                max_ttl_seconds=float(spec.get("max_ttl_seconds", default_max)),
+            )
+
+        tools = {
+            name: _policy(spec or {}, name)
+            for name, spec in (section.get("tools") or {}).items()
+        }
+        for name in never_cache - tools.keys():
+            tools[name] = _policy({}, name)
+
+        rules = []
+        for rule in section.get("rules") or ():
+            if "regex" in rule:
+                pattern = re.compile(rule["regex"])
+            else:
+                pattern = re.compile(fnmatch.translate(rule["match"]))
+            rules.append((pattern, _policy(rule)))
+
+        return cls(
+            tools=MappingProxyType(tools),
+            rules=tuple(rules),
+            default=_policy({}),
+            enabled=enabled,
+            max_result_chars=int(section.get("max_result_chars", 500)),
+            session=MappingProxyType(dict(config.get("session") or {})),
+            routing=MappingProxyType(dict(config.get("routing") or {})),
+        )
+
+
+def _ttl_seconds(spec: Mapping[str, Any], prefix: str = "", fallback: float = 0.0) -> float:
+    """TTL from "<prefix>ttl_seconds", else "<prefix>ttl_hours", else fallback."""
+    if f"{prefix}ttl_seconds" in spec:
+        return float(spec[f"{prefix}ttl_seconds"])
+    if f"{prefix}ttl_hours" in spec:
+        return float(spec[f"{prefix}ttl_hours"]) * 3600
+    return fallback
+
+
+class PolicyEngine:
+    """
+    Serve the compiled policy for a config file.
+
+    Flow:
+    1. First access loads and compiles the YAML
+    2. At most every check_interval seconds, the file's mtime/size is checked
+    3. On change the file is recompiled and the new policy swapped in with one
+       assignment; readers see either the old or the new policy, never a mix
+    4. A config that fails to parse is logged and the previous policy kept
+    """
+
+    def __init__(self, path: str = DEFAULT_CONFIG_PATH, check_interval: float = 1.0):
+        """
+        Args:
+            path: YAML config file
+            check_interval: Min seconds between file change checks (0 = every access)
+        """
+        self.path = path
+        self.check_interval = check_interval
+        self._policy: CachePolicy | None = None
+        self._signature: tuple[int, int] | None = None
+        self._next_check = 0.0
+
+    @property
+    def policy(self) -> CachePolicy:
+        """Current compiled policy (reloaded first if the file changed)."""
+        now = time.monotonic()
+        if self._policy is None or now >= self._next_check:
+            self._next_check = now + self.check_interval
+            if self._policy is None or self._file_signature() != self._signature:
+                self.reload()
+        return self._policy
+
+    def lookup(self, tool_name: str) -> ToolPolicy:
+        return self.policy.lookup(tool_name)
+
+    def reload(self) -> bool:
+        """Recompile from disk. Returns False (keeping the old policy) on error."""
+        signature = self._file_signature()
+        try:
+            config = yaml.safe_load(Path(self.path).read_text()) if signature else None
+            policy = CachePolicy.compile(config)
+        except (OSError, yaml.YAMLError, AttributeError, KeyError, TypeError, ValueError, re.error) as e:
+            logger.warning(f"Invalid cache policy config {self.path}: {e}")
+            if self._policy is None:
+                self._policy = CachePolicy.compile(None)
+            self._signature = signature
+            return False
+
+        if signature is None:
+            logger.warning(f"Cache policy config not found: {self.path}")
+        self._policy, self._signature = policy, signature
+        logger.debug(f"Loaded cache policy: {self.path}")
+        return True
+
+    def _file_signature(self) -> tuple[int, int] | None:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+
+_default_engine: PolicyEngine | None = None
+
+
+def get_policy_engine() -> PolicyEngine:
+    """Process-wide engine for src/config/memory_config.yaml."""
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = PolicyEngine()
+    return _default_engine
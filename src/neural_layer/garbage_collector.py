@@ -0,0 +1,78 @@
+"""
+Garbage collection helpers for the brain database.
+Expired memories are deleted in bounded batches; VACUUM runs off the event loop.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+# Pages released per incremental vacuum call (4KB pages → ~8MB)
+INCREMENTAL_VACUUM_PAGES = 2000
+
+
+@dataclass
+class GCStats:
+    memories_deleted: int = 0
+    tool_cache_deleted: int = 0
+    batches: int = 0
+    bytes_reclaimed: int = 0  # Shrink of the DB file (only after vacuum)
+    free_bytes: int = 0  # Free pages left inside the DB file, reusable by SQLite
+
+    def merge(self, other: "GCStats") -> None:
+        self.memories_deleted += other.memories_deleted
+        self.tool_cache_deleted += other.tool_cache_deleted
+        self.batches += other.batches
+        self.bytes_reclaimed += other.bytes_reclaimed
+        self.free_bytes = other.free_bytes
+
+
+def db_file_size(db_path: str) -> int:
+    """Size of the DB file plus its WAL, 0 if missing."""
+    return sum(
+        os.path.getsize(path)
+        for path in (db_path, f"{db_path}-wal")
+        if os.path.exists(path)
+    )
+
+
+def free_bytes(db_path: str) -> int:
+    """Bytes held by free pages (reclaimable by vacuum)."""
+    if not os.path.exists(db_path):
+        return 0
+    conn = sqlite3.connect(db_path)
+    try:
+        free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        return free_pages * page_size
+    finally:
+        conn.close()
+
+
+def vacuum_database(db_path: str, pages: int = INCREMENTAL_VACUUM_PAGES) -> None:
+    """
+    Release free pages back to the filesystem. Blocking — run in a thread.
+
+    The first call switches the DB to auto_vacuum=INCREMENTAL with one full
+    VACUUM; later calls only run a bounded incremental vacuum.
+    """
+    if not os.path.exists(db_path):
+        return
+    conn = sqlite3.connect(db_path, timeout=5)
+    try:
+        mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        if mode == 2:  # INCREMENTAL
+            conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+        else:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+    except sqlite3.OperationalError as e:
+        # Busy DB: skip this round, the next GC run will retry
+        logger.warning(f"Vacuum skipped for {db_path}: {e}")
+    finally:
+        conn.close()
@@ -0,0 +1,197 @@
+"""
+InMemoryBackend: Pure-Python, in-process memory engine.
+Used when neural_memory is not installed, or for ephemeral agents that do not need a brain DB.
+Implements the subset of SQLiteStorage / MemoryEncoder / ReflexPipeline that NeuralMemoryLayer uses.
+"""
+from __future__ import annotations
+
+import itertools
+import math
+import re
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any
+
+_TOKEN = re.compile(r"[a-z0-9_]+")
+
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "did", "do", "for", "from",
+    "how", "in", "is", "it", "of", "on", "or", "that", "the", "this", "to",
+    "was", "we", "what", "when", "where", "which", "who", "why", "with",
+}
+
+# Max memories joined into the recall context, by traversal depth
+_RESULTS_BY_DEPTH = {1: 3, 2: 5, 3: 10}
+
+
+def tokenize(text: str) -> set[str]:
+    """Lowercase keyword set used for indexing and matching."""
+    return {
+        token for token in _TOKEN.findall(text.lower())
+        if len(token) > 1 and token not in _STOPWORDS
+    }
+
+
+@dataclass
+class MemoryEntry:
+    id: int
+    content: str
+    memory_type: str
+    created_at: float
+    expires_at: float | None = None
+    metadata: dict[str, Any] = field(default_factory=dict)
+    tokens: frozenset[str] = frozenset()
+
+    def is_expired(self, now: float | None = None) -> bool:
+        if self.expires_at is None:
+            return False
+        return (now if now is not None else time.time()) >= self.expires_at
+
+
+@dataclass
+class RecallResult:
+    context: str
+    confidence: float  # Keyword weight matched by the best memory, scaled by coverage (0-1)
+    memories: list[MemoryEntry] = field(default_factory=list)
+
+
+class InMemoryBackend:
+    """
+    Typed memory records with expiry, an inverted keyword index and
+    IDF-weighted confidence scoring.
+
+    One instance serves as storage, encoder and pipeline for NeuralMemoryLayer.
+    """
+
+    def __init__(self):
+        self._entries: dict[int, MemoryEntry] = {}
+        self._index: dict[str, set[int]] = defaultdict(set)
+        self._ids = itertools.count(1)
+
+    # ─── Storage API ────────────────────────────────────────────
+
+    def disable_auto_save(self) -> None:
+        """No-op: nothing to persist."""
+
+    def enable_auto_save(self) -> None:
+        """No-op: nothing to persist."""
+
+    async def batch_save(self) -> None:
+        """No-op: nothing to persist."""
+
+    async def close(self) -> None:
+        """No-op: memories live as long as the process."""
+
+    # ─── Encoder API ────────────────────────────────────────────
+
+    async def encode(
+        self,
+        content: str,
+        memory_type: str = "fact",
+        expires: float | None = None,
+        metadata: dict[str, Any] | None = None,
+    ) -> MemoryEntry:
+        """
+        Store a memory and index its keywords.
+
+        Args:
+            content: Memory text
+            memory_type: "decision", "context", "insight", "fact"
+            expires: Hours until expiry (None = never)
+            metadata: Extra attributes (e.g. cache_key, tool)
+        """
+        now = time.time()
+        entry = MemoryEntry(
+            id=next(self._ids),
+            content=content,
+            memory_type=memory_type,
+            created_at=now,
+            expires_at=None if expires is None else now + expires * 3600,
+            metadata=dict(metadata or {}),
+            tokens=frozenset(tokenize(content)),
+        )
+        self._entries[entry.id] = entry
+        for token in entry.tokens:
+            self._index[token].add(entry.id)
+        return entry
+
+    # ─── Pipeline API ───────────────────────────────────────────
+
+    async def query(self, query: str, depth: int | None = None) -> RecallResult | None:
+        """
+        Recall memories sharing keywords with query.
+
+        Returns:
+            RecallResult with the best matches joined into context, or None.
+        """
+        query_tokens = tokenize(query)
+        if not query_tokens:
+            return None
+
+        now = time.time()
+        total = len(self._entries) or 1
+        # IDF weights; keywords no memory contains carry no evidence either way
+        weights = {
+            token: math.log(1 + total / len(self._index[token]))
+            for token in query_tokens
+            if self._index.get(token)
+        }
+        if not weights:
+            return None
+        total_weight = sum(weights.values())
+        # Penalize queries whose keywords are mostly unknown to memory
+        coverage = 0.5 + 0.5 * len(weights) / len(query_tokens)
+
+        scores: dict[int, float] = defaultdict(float)
+        for token, weight in weights.items():
+            for entry_id in self._index[token]:
+                scores[entry_id] += weight
+
+        ranked = []
+        for entry_id, score in scores.items():
+            entry = self._entries[entry_id]
+            if entry.is_expired(now):
+                self._remove(entry)
+                continue
+            ranked.append((score / total_weight * coverage, entry))
+        if not ranked:
+            return None
+
+        ranked.sort(key=lambda item: (item[0], item[1].created_at), reverse=True)
+        top = [entry for _, entry in ranked[:_RESULTS_BY_DEPTH.get(depth or 2, 5)]]
+        return RecallResult(
+            context=" ".join(entry.content for entry in top),
+            confidence=min(1.0, ranked[0][0]),
+            memories=top,
+        )
+
+    # ─── Maintenance ────────────────────────────────────────────
+
+    def purge_expired(self, limit: int | None = None) -> int:
+        """
+        Delete expired memories.
+
+        Args:
+            limit: Max memories to delete in this call (None = all)
+
+        Returns:
+            Number of memories deleted.
+        """
+        now = time.time()
+        expired = [e for e in self._entries.values() if e.is_expired(now)]
+        for entry in expired[:limit]:
+            self._remove(entry)
+        return len(expired[:limit])
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, entry: MemoryEntry) -> None:
+        self._entries.pop(entry.id, None)
+        for token in entry.tokens:
+            postings = self._index.get(token)
+            if postings is not None:
+                postings.discard(entry.id)
+                if not postings:
+                    del self._index[token]
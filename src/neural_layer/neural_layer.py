@@ -5,11 +5,20 @@ Provides unified interface: store, recall, cache tool results.
 from __future__ import annotations
 
 import asyncio
-import hashlib
-import json
 import logging
 from datetime import datetime, timedelta
-from typing import Any
+from typing import Any, Awaitable, Callable
+
+from ..assembler.tokenizer import HeuristicTokenizer, Tokenizer, truncate_to_tokens
+from ..cache_policy.adaptive_ttl import AdaptiveTTL
+from ..cache_policy.cache_key import canonicalize_args, hash_cache_key
+from .garbage_collector import GCStats, db_file_size, free_bytes, vacuum_database
+from .memory_backend import InMemoryBackend
+from .recall_cache import RecallCache
+from .single_flight import SingleFlight
+from .tool_cache import ToolResultCache
+from .write_behind import WriteBehindQueue
+from .write_buffer import MemoryRecord, WriteBuffer
 
 try:
     from neural_memory import Brain
@@ -36,13 +45,89 @@ class NeuralMemoryLayer:
     - Compressing session history into episodic memories
     """
 
-    def __init__(self, project_name: str, db_path: str | None = None):
+    def __init__(
+        self,
+        project_name: str,
+        db_path: str | None = None,
+        tool_cache_size: int = 1024,
+        write_buffer_size: int = 0,
+        write_buffer_delay: float = 1.0,
+        write_behind: bool = False,
+        write_behind_workers: int = 2,
+        write_behind_queue_size: int = 1000,
+        write_behind_max_spill: int = 10000,
+        recall_cache_size: int = 256,
+        recall_cache_ttl: float = 60.0,
+        in_memory: bool = False,
+        tokenizer: Tokenizer | None = None,
+        adaptive_ttl: AdaptiveTTL | None = None,
+    ):
+        """
+        Args:
+            project_name: Brain name, one brain per project
+            db_path: SQLite file (default: .openclaw/{project_name}_memory.db)
+            tool_cache_size: Max entries in the in-process tool cache tier
+            write_buffer_size: Buffer store_* calls and flush in batches of this
+                size (0 = write through, one transaction per call)
+            write_buffer_delay: Max seconds a buffered memory waits before flush
+            write_behind: Persist in background workers; store_* return at once.
+                Takes precedence over write_buffer_size (workers batch already).
+            write_behind_workers: Number of background writer tasks
+            write_behind_queue_size: Queued memories before spilling to
+                {db_path}.spill.jsonl (in-memory layers wait for queue space instead)
+            write_behind_max_spill: Max spilled memories; beyond it store_* waits
+                for queue space
+            recall_cache_size: Max memoized pipeline queries (0 = disabled)
+            recall_cache_ttl: Seconds a memoized query result stays valid
+            in_memory: Use the in-process backend instead of the brain DB
+                (always the case when neural_memory is not installed)
+            tokenizer: Token counter for context budgets (default: ~4 chars/token
+                heuristic; share the assembler's CachedTokenizer to count once)
+            adaptive_ttl: Adjust get_or_call_tool TTLs per (tool, args) from how
+                often re-fetched results actually changed
+        """
         self.project_name = project_name
         self.db_path = db_path or f".openclaw/{project_name}_memory.db"
+        self.in_memory = in_memory or not NEURAL_MEMORY_AVAILABLE
+        self.tokenizer = tokenizer or HeuristicTokenizer()
+        self.adaptive_ttl = adaptive_ttl
+        # Exact-match tool cache; persistent tier in its own file next to the brain DB
+        self._tool_cache = ToolResultCache(
+            db_path=None if self.in_memory else f"{self.db_path}.tool_cache.db",
+            max_entries=tool_cache_size,
+        )
         self._storage: SQLiteStorage | None = None
         self._brain: Brain | None = None
         self._encoder: MemoryEncoder | None = None
         self._pipeline: ReflexPipeline | None = None
+        self._buffer: WriteBuffer | None = None
+        if write_buffer_size > 0:
+            self._buffer = WriteBuffer(
+                self._encode_batch,
+                max_items=write_buffer_size,
+                max_delay_seconds=write_buffer_delay,
+            )
+        self._write_behind: WriteBehindQueue | None = None
+        if write_behind:
+            self._write_behind = WriteBehindQueue(
+                self._encode_batch,
+                max_queue=write_behind_queue_size,
+                workers=write_behind_workers,
+                # In-memory layers have nothing to recover a spill into on restart
+                spill_path=None if self.in_memory else f"{self.db_path}.spill.jsonl",
+                max_spill=write_behind_max_spill,
+            )
+        # Memoized pipeline queries, invalidated on every write
+        self._recall_cache = RecallCache(
+            max_entries=recall_cache_size,
+            ttl_seconds=recall_cache_ttl,
+        )
+        # Coalesces concurrent identical lookup → tool → store sequences
+        self._single_flight = SingleFlight()
+        # Serializes storage transactions between concurrent writers
+        self._write_lock = asyncio.Lock()
+        self._gc_task: asyncio.Task | None = None
+        self.gc_totals = GCStats()
         self._initialized = False
 
     async def initialize(self) -> None:
@@ -50,8 +135,11 @@ class NeuralMemoryLayer:
         if self._initialized:
             return
 
-        if not NEURAL_MEMORY_AVAILABLE:
-            logger.warning("NeuralMemory not installed. Running in mock mode.")
+        if self.in_memory:
+            if not NEURAL_MEMORY_AVAILABLE:
+                logger.warning("NeuralMemory not installed. Using in-memory backend.")
+            backend = InMemoryBackend()
+            self._storage = self._encoder = self._pipeline = backend
             self._initialized = True
             return
 
@@ -79,14 +167,7 @@ class NeuralMemoryLayer:
         Use for: technology selection, design patterns, config choices.
         Does not expire — decisions are important long-term.
         """
-        await self._ensure_initialized()
-        if not NEURAL_MEMORY_AVAILABLE:
-            logger.info(f"[MOCK] Would store decision: {content[:80]}")
-            return
-        full_content = f"[DECISION] {content}"
-        if context:
-            full_content += f" | Context: {context}"
-        await self._encoder.encode(full_content, memory_type="decision")
+        await self._write(MemoryRecord.decision(content, context))
         logger.debug(f"Stored decision: {content[:80]}")
 
     async def store_context(self, content: str, expires_hours: int = 24) -> None:
@@ -95,41 +176,72 @@ class NeuralMemoryLayer:
         Use for: current task, workflow state.
         Auto-expires after expires_hours.
         """
-        await self._ensure_initialized()
-        if not NEURAL_MEMORY_AVAILABLE:
-            logger.info(f"[MOCK] Would store context: {content[:80]}")
-            return
-        await self._encoder.encode(
-            content,
-            memory_type="context",
-            expires=expires_hours,
-        )
+        await self._write(MemoryRecord.context(content, expires_hours))
 
     async def store_insight(self, content: str) -> None:
         """
         Store pattern/lesson learned from errors or successes.
         Use for: bug patterns, optimization insights, gotchas.
         """
-        await self._ensure_initialized()
-        if not NEURAL_MEMORY_AVAILABLE:
-            logger.info(f"[MOCK] Would store insight: {content[:80]}")
-            return
-        await self._encoder.encode(
-            f"[INSIGHT] {content}",
-            memory_type="insight",
-        )
+        await self._write(MemoryRecord.insight(content))
 
     async def store_fact(self, content: str, expires_hours: int | None = None) -> None:
         """Store short-term or long-term fact."""
+        await self._write(MemoryRecord.fact(content, expires_hours))
+
+    async def store_many(self, records: list[MemoryRecord]) -> None:
+        """
+        Store memories of mixed types in one batch (single transaction).
+        Use for: replaying session logs, burst event ingestion.
+
+        Example:
+            await memory.store_many([
+                MemoryRecord.decision("Use SQLite", "portable"),
+                MemoryRecord.insight("Retry on lock errors"),
+            ])
+        """
         await self._ensure_initialized()
-        if not NEURAL_MEMORY_AVAILABLE:
-            logger.info(f"[MOCK] Would store fact: {content[:80]}")
-            return
-        await self._encoder.encode(
-            content,
-            memory_type="fact",
-            expires=expires_hours,
-        )
+        if self._write_behind is not None:
+            for record in records:
+                await self._write_behind.submit(record)
+        elif self._buffer is not None:
+            for record in records:
+                await self._buffer.add(record)
+        else:
+            await self._encode_batch(records)
+
+    async def flush(self) -> int:
+        """
+        Flush buffered writes now (waits for background writers to drain).
+
+        Returns:
+            Number of buffered memories flushed (0 when write buffering is off).
+        """
+        if self._write_behind is not None:
+            await self._write_behind.join()
+        if self._buffer is None:
+            return 0
+        return await self._buffer.flush()
+
+    async def close(self) -> None:
+        """Flush pending writes and release storage — call when agent stops."""
+        await self.stop_gc()
+        if self._write_behind is not None:
+            await self._write_behind.close()
+        if self._buffer is not None:
+            await self._buffer.close()
+        self._tool_cache.close()
+        if self._storage is not None:
+            await self._storage.close()
+            self._storage = None
+        self._initialized = False
+
+    async def __aenter__(self) -> "NeuralMemoryLayer":
+        await self.initialize()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
 
     # ─── Tool Result Cache ───────────────────────────────────────
 
@@ -138,37 +250,45 @@ class NeuralMemoryLayer:
         tool_name: str,
         args: dict[str, Any] | str,
         result: str,
-        ttl_hours: int = 1,
+        ttl_hours: float = 1,
         max_result_chars: int = 500,
+        ttl_seconds: float | None = None,
     ) -> None:
         """
         Cache result of a tool call.
+        The exact-match index is updated before returning, so the result is
+        readable right away even when persistence runs in the background.
+        The index keeps the full result; only the semantic memory is trimmed.
 
         Args:
             tool_name: Tool name (e.g., "read_file", "search_web")
             args: Arguments passed to tool
-            result: Result returned (will be trimmed if too long)
-            ttl_hours: Time-to-live for cache
-            max_result_chars: Max length of result to store
+            result: Result returned
+            ttl_hours: Time-to-live for cache (<= 0 = do not store)
+            max_result_chars: Max length of result in the semantic memory
+            ttl_seconds: Time-to-live in seconds (overrides ttl_hours)
         """
-        await self._ensure_initialized()
-        if not NEURAL_MEMORY_AVAILABLE:
-            logger.info(f"[MOCK] Would cache tool result: {tool_name}")
+        if ttl_seconds is None:
+            ttl_seconds = ttl_hours * 3600
+        if ttl_seconds <= 0:
             return
-        args_str = json.dumps(args) if isinstance(args, dict) else str(args)
-        
+        await self._ensure_initialized()
+        args_str = canonicalize_args(tool_name, args)
+
         result_trimmed = result[:max_result_chars]
         if len(result) > max_result_chars:
             result_trimmed += "... [trimmed]"
 
-        content = f"[TOOL_CACHE] {tool_name}({args_str}) → {result_trimmed}"
         cache_key = self._make_cache_key(tool_name, args_str)
-        
-        await self._encoder.encode(
-            content,
-            memory_type="fact",
-            expires=ttl_hours,
-            metadata={"cache_key": cache_key, "tool": tool_name},
+        self._tool_cache.put(cache_key, tool_name, result, ttl_seconds=ttl_seconds)
+
+        await self._write(
+            MemoryRecord(
+                f"[TOOL_CACHE] {tool_name}({args_str}) → {result_trimmed}",
+                memory_type="fact",
+                expires_hours=ttl_seconds / 3600,
+                metadata={"cache_key": cache_key, "tool": tool_name},
+            )
         )
 
     async def get_cached_tool_result(
@@ -180,27 +300,82 @@ class NeuralMemoryLayer:
         """
         Check cache before calling real tool.
 
+        Exact (tool_name, args) matches are served from the tool cache index
+        without graph traversal. Semantic recall is only the fuzzy fallback
+        (brain DB only).
+
         Returns:
-            Cached result string if available and confidence is high enough.
-            None if real tool call is needed.
+            Cached result string if available and confidence is high enough
+            (a semantic hit returns the result as stored in memory, which may
+            be trimmed). None if real tool call is needed.
         """
         await self._ensure_initialized()
-        if not NEURAL_MEMORY_AVAILABLE:
-            logger.info(f"[MOCK] Would check cache for: {tool_name}")
+        args_str = canonicalize_args(tool_name, args)
+
+        cached = self._tool_cache.get(self._make_cache_key(tool_name, args_str))
+        if cached is not None:
+            logger.debug(f"Exact cache hit for {tool_name}")
+            return cached
+        if self.in_memory:
+            # Every cached result lives in the exact index; keyword recall
+            # would only match other args of the same tool.
             return None
-        args_str = json.dumps(args) if isinstance(args, dict) else str(args)
+
         query = f"{tool_name} {args_str}"
-        
-        result = await self._pipeline.query(query)
-        
+
+        result = await self._query(query)
+
         if result and result.confidence >= min_confidence:
             # Only return if result is actually tool cache (not wrong recall)
-            if "[TOOL_CACHE]" in result.context and tool_name in result.context:
+            cached = _tool_cache_payload(result.context, tool_name)
+            if cached is not None:
                 logger.debug(f"Cache hit for {tool_name}: confidence={result.confidence:.2f}")
-                return result.context
-        
+                return cached
+
         return None
 
+    async def get_or_call_tool(
+        self,
+        tool_name: str,
+        args: dict[str, Any] | str,
+        call_fn: Callable[[], Awaitable[str]],
+        ttl_hours: float = 1,
+        min_confidence: float = 0.80,
+        ttl_seconds: float | None = None,
+    ) -> str:
+        """
+        Cache lookup → real tool call → cache store, as one single-flight unit.
+        Concurrent identical (tool_name, args) requests wait on the same call,
+        so N parallel misses cost one tool call and one cache write.
+
+        Args:
+            tool_name: Tool name (e.g., "read_file", "search_web")
+            args: Arguments passed to tool
+            call_fn: Async function calling the real tool, no arguments
+            ttl_hours: Time-to-live for cache (0 = do not store)
+            min_confidence: Confidence needed to accept a semantic cache hit
+            ttl_seconds: Time-to-live in seconds (overrides ttl_hours). With
+                adaptive_ttl, the starting TTL for this (tool, args)
+
+        Returns:
+            Cached or fresh tool result.
+        """
+        cache_key = self._make_cache_key(tool_name, canonicalize_args(tool_name, args))
+
+        async def _lookup_or_call() -> str:
+            cached = await self.get_cached_tool_result(tool_name, args, min_confidence)
+            if cached is not None:
+                return cached
+            result = await call_fn()
+            ttl = ttl_hours * 3600 if ttl_seconds is None else ttl_seconds
+            if ttl > 0:
+                if self.adaptive_ttl is not None:
+                    ttl = self.adaptive_ttl.observe(tool_name, cache_key, result, ttl)
+                await self.cache_tool_result(tool_name, args, result, ttl_seconds=ttl)
+            return result
+
+        return await self._single_flight.do(cache_key, _lookup_or_call)
+
     # ─── Recall Methods ─────────────────────────────────────────
 
     async def recall(
@@ -221,16 +396,50 @@ class NeuralMemoryLayer:
             Context string if found, None otherwise.
         """
         await self._ensure_initialized()
-        if not NEURAL_MEMORY_AVAILABLE:
-            logger.info(f"[MOCK] Would recall: {query}")
-            return None
-        result = await self._pipeline.query(query, depth=depth)
-        
+        result = await self._query(query, depth=depth)
+
         if result and result.confidence >= min_confidence:
             return result.context
         
         return None
 
+    async def recall_many(
+        self,
+        queries: list[str],
+        min_confidence: float = 0.5,
+        depth: int = 2,
+        max_concurrency: int = 4,
+    ) -> list[str | None]:
+        """
+        Recall several queries concurrently (e.g. decisions + insights + summaries).
+        Identical queries in one batch are only traversed once.
+
+        Args:
+            queries: Questions or keywords to remember
+            min_confidence: Minimum confidence threshold (0-1)
+            depth: Number of hops for graph traversal (1=close, 3=deep)
+            max_concurrency: Max pipeline queries running at once (>= 1)
+
+        Returns:
+            One context string (or None) per query, in input order.
+        """
+        if max_concurrency < 1:
+            raise ValueError(f"max_concurrency must be >= 1, got {max_concurrency}")
+        await self._ensure_initialized()
+        unique: dict[str, str] = {}
+        for query in queries:
+            unique.setdefault(RecallCache.normalize(query), query)
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def _recall_one(query: str) -> str | None:
+            async with semaphore:
+                return await self.recall(query, min_confidence, depth)
+
+        results = await asyncio.gather(*(_recall_one(q) for q in unique.values()))
+        by_key = dict(zip(unique.keys(), results))
+        return [by_key[RecallCache.normalize(q)] for q in queries]
+
     async def get_task_context(
         self,
         task_description: str,
@@ -242,32 +451,168 @@ class NeuralMemoryLayer:
 
         Args:
             task_description: Description of current task
-            max_tokens_approx: Estimated token limit (~4 chars/token)
+            max_tokens_approx: Token limit for the context, per self.tokenizer
 
         Returns:
             Context string filtered and trimmed.
         """
         await self._ensure_initialized()
-        if not NEURAL_MEMORY_AVAILABLE:
-            logger.info(f"[MOCK] Would get task context: {task_description[:50]}")
-            return ""
-        result = await self._pipeline.query(task_description, depth=2)
-        
+        result = await self._query(task_description, depth=2)
+
         if not result or not result.context:
             return ""
 
         # Trim by token budget
-        max_chars = max_tokens_approx * 4
-        context = result.context[:max_chars]
-        
+        context = truncate_to_tokens(result.context, max_tokens_approx, self.tokenizer)
+
         return f"[Memory Context] {context} [/Memory Context]"
 
+    # ─── Garbage Collection ─────────────────────────────────────
+
+    async def collect_garbage(
+        self,
+        batch_size: int = 100,
+        max_batches: int = 10,
+        vacuum: bool = False,
+    ) -> GCStats:
+        """
+        Delete expired memories and tool cache entries in bounded batches.
+        Yields to the event loop between batches; call repeatedly (or use
+        start_gc) to work through a large backlog incrementally.
+
+        Args:
+            batch_size: Expired memories deleted per batch
+            max_batches: Max batches in this run
+            vacuum: Return free pages to the filesystem afterwards (runs in a thread)
+
+        Returns:
+            GCStats for this run (cumulative totals in self.gc_totals).
+        """
+        await self._ensure_initialized()
+        stats = GCStats()
+        size_before = 0 if self.in_memory else db_file_size(self.db_path)
+
+        stats.tool_cache_deleted = self._tool_cache.purge_expired(limit=batch_size * max_batches)
+        for _ in range(max_batches):
+            async with self._write_lock:
+                deleted = await self._delete_expired_batch(batch_size)
+            stats.batches += 1
+            stats.memories_deleted += deleted
+            if deleted < batch_size:
+                break
+            await asyncio.sleep(0)
+
+        if stats.memories_deleted:
+            self._recall_cache.invalidate()
+
+        if not self.in_memory:
+            if vacuum:
+                await asyncio.to_thread(vacuum_database, self.db_path)
+            stats.bytes_reclaimed = max(0, size_before - db_file_size(self.db_path))
+            stats.free_bytes = await asyncio.to_thread(free_bytes, self.db_path)
+
+        self.gc_totals.merge(stats)
+        logger.info(
+            f"GC: {stats.memories_deleted} memories, {stats.tool_cache_deleted} tool cache "
+            f"entries deleted, {stats.bytes_reclaimed} bytes reclaimed"
+        )
+        return stats
+
+    def start_gc(
+        self,
+        interval_seconds: float = 3600,
+        batch_size: int = 100,
+        max_batches: int = 10,
+        vacuum: bool = True,
+    ) -> None:
+        """Run collect_garbage periodically in a background task."""
+        if self._gc_task is not None:
+            return
+
+        async def _gc_loop() -> None:
+            while True:
+                await asyncio.sleep(interval_seconds)
+                try:
+                    await self.collect_garbage(batch_size, max_batches, vacuum)
+                except Exception as e:
+                    logger.error(f"Scheduled GC failed: {e}")
+
+        self._gc_task = asyncio.create_task(_gc_loop())
+
+    async def stop_gc(self) -> None:
+        """Cancel the scheduled GC task, if any."""
+        if self._gc_task is None:
+            return
+        self._gc_task.cancel()
+        await asyncio.gather(self._gc_task, return_exceptions=True)
+        self._gc_task = None
+
     # ─── Helpers ────────────────────────────────────────────────
 
     async def _ensure_initialized(self) -> None:
         if not self._initialized:
             await self.initialize()
 
+    async def _write(self, record: MemoryRecord) -> None:
+        await self._ensure_initialized()
+        if self._write_behind is not None:
+            await self._write_behind.submit(record)
+        elif self._buffer is not None:
+            await self._buffer.add(record)
+        else:
+            await self._encode_batch([record])
+
+    async def _delete_expired_batch(self, batch_size: int) -> int:
+        if self.in_memory:
+            return self._storage.purge_expired(limit=batch_size)
+        expired = await self._storage.get_expired_memories(limit=batch_size)
+        for memory in expired:
+            await self._storage.delete_typed_memory(memory.fiber_id)
+            await self._storage.delete_fiber(memory.fiber_id)
+        return len(expired)
+
+    async def _query(self, query: str, depth: int | None = None) -> Any:
+        """Run a pipeline query through the recall cache."""
+        hit, result = self._recall_cache.get(query, depth)
+        if hit:
+            return result
+        generation = self._recall_cache.generation
+        if depth is None:
+            result = await self._pipeline.query(query)
+        else:
+            result = await self._pipeline.query(query, depth=depth)
+        self._recall_cache.put(query, depth, result, generation)
+        return result
+
+    async def _encode_batch(self, records: list[MemoryRecord]) -> None:
+        """Encode records with auto-save off, then commit once."""
+        async with self._write_lock:
+            self._storage.disable_auto_save()
+            try:
+                for record in records:
+                    await self._encoder.encode(
+                        record.content,
+                        memory_type=record.memory_type,
+                        expires=record.expires_hours,
+                        metadata=record.metadata or None,
+                    )
+            finally:
+                self._storage.enable_auto_save()
+            await self._storage.batch_save()
+        # New memories can change any recall result
+        self._recall_cache.invalidate()
+
     def _make_cache_key(self, tool_name: str, args_str: str) -> str:
-        raw = f"{tool_name}:{args_str}"
-        return hashlib.md5(raw.encode()).hexdigest()[:12]
+        return hash_cache_key(tool_name, args_str)
+
+
+def _tool_cache_payload(context: str, tool_name: str) -> str | None:
+    """Result part of a "[TOOL_CACHE] tool(args) → result" memory, None if context is not one."""
+    marker = f"[TOOL_CACHE] {tool_name}("
+    start = context.find(marker)
+    if start < 0:
+        return None
+    arrow = context.find(" → ", start + len(marker))
+    if arrow < 0:
+        return None
+    return context[arrow + len(" → "):]
@@ -0,0 +1,167 @@
+"""
+NeuralMemoryPool: Share initialized NeuralMemoryLayer instances across requests in one process.
+For multi-tenant gateways: one open layer per (project, db_path), bounded open handles, idle eviction.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator
+
+from .neural_layer import NeuralMemoryLayer
+from .single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _PoolEntry:
+    layer: NeuralMemoryLayer
+    refs: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+    opening: bool = False  # Slot reserved, initialize() in progress — never evicted
+
+
+class NeuralMemoryPool:
+    """
+    Registry of initialized layers keyed by (project_name, db_path).
+
+    Flow:
+    1. acquire() returns the open layer for a project, opening it on first use
+    2. Concurrent first acquires for one project share a single initialize()
+    3. Opening beyond max_open evicts the least recently used idle layer,
+       or waits for a release when every layer is in use
+    4. Layers idle longer than idle_seconds are closed; the next acquire re-opens
+    """
+
+    def __init__(
+        self,
+        max_open: int = 64,
+        idle_seconds: float = 600.0,
+        **layer_kwargs: Any,
+    ):
+        """
+        Args:
+            max_open: Max layers open at once (bounds file descriptors)
+            idle_seconds: Close layers unused for this long
+            layer_kwargs: Passed to every NeuralMemoryLayer (e.g. write_behind=True)
+        """
+        self.max_open = max_open
+        self.idle_seconds = idle_seconds
+        self._layer_kwargs = layer_kwargs
+        self._entries: dict[tuple[str, str], _PoolEntry] = {}
+        self._opening = SingleFlight()
+        self._room = asyncio.Condition()
+        self._last_sweep = time.monotonic()
+
+    # ─── Public API ─────────────────────────────────────────────
+
+    async def acquire(self, project_name: str, db_path: str | None = None) -> NeuralMemoryLayer:
+        """Get the shared, initialized layer for a project. Pair with release()."""
+        key = self._key(project_name, db_path)
+        entry = self._entries.get(key)
+        if entry is None or not entry.layer._initialized:
+            entry = await self._opening.do("\x00".join(key), lambda: self._open(key))
+        entry.refs += 1
+        entry.last_used = time.monotonic()
+
+        if time.monotonic() - self._last_sweep > self.idle_seconds / 4:
+            await self.evict_idle()
+        return entry.layer
+
+    async def release(self, layer: NeuralMemoryLayer) -> None:
+        """Return a layer obtained from acquire()."""
+        entry = self._entries.get(self._key(layer.project_name, layer.db_path))
+        if entry is None or entry.layer is not layer:
+            return
+        entry.refs = max(0, entry.refs - 1)
+        entry.last_used = time.monotonic()
+        if entry.refs == 0:
+            async with self._room:
+                self._room.notify_all()
+
+    @asynccontextmanager
+    async def lease(
+        self, project_name: str, db_path: str | None = None
+    ) -> AsyncIterator[NeuralMemoryLayer]:
+        """
+        Example:
+            async with pool.lease("tenant-a") as memory:
+                await memory.recall("...")
+        """
+        layer = await self.acquire(project_name, db_path)
+        try:
+            yield layer
+        finally:
+            await self.release(layer)
+
+    async def evict_idle(self) -> int:
+        """Close layers unused for idle_seconds. Returns number closed."""
+        self._last_sweep = time.monotonic()
+        cutoff = self._last_sweep - self.idle_seconds
+        idle = [
+            key for key, entry in self._entries.items()
+            if entry.refs == 0 and not entry.opening and entry.last_used <= cutoff
+        ]
+        for key in idle:
+            await self._close_entry(key)
+        return len(idle)
+
+    async def close(self) -> None:
+        """Close every layer — call on gateway shutdown."""
+        for key in list(self._entries):
+            await self._close_entry(key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ─── Helpers ────────────────────────────────────────────────
+
+    def _key(self, project_name: str, db_path: str | None) -> tuple[str, str]:
+        return (project_name, db_path or f".openclaw/{project_name}_memory.db")
+
+    async def _open(self, key: tuple[str, str]) -> _PoolEntry:
+        existing = self._entries.get(key)
+        if existing is not None and existing.layer._initialized:
+            return existing
+
+        async with self._room:
+            while existing is None and len(self._entries) >= self.max_open:
+                victim = self._least_recently_used_idle()
+                if victim is None:
+                    await self._room.wait()
+                    continue
+                await self._close_entry(victim)
+            if existing is None:
+                # Reserve the slot before initializing so the cap holds under concurrency
+                existing = _PoolEntry(
+                    NeuralMemoryLayer(key[0], key[1], **self._layer_kwargs), opening=True
+                )
+                self._entries[key] = existing
+
+        try:
+            await existing.layer.initialize()
+        except BaseException:
+            self._entries.pop(key, None)
+            async with self._room:
+                self._room.notify_all()
+            raise
+        finally:
+            existing.opening = False
+        logger.debug(f"Opened memory layer: {key[0]} ({len(self._entries)} open)")
+        return existing
+
+    def _least_recently_used_idle(self) -> tuple[str, str] | None:
+        idle = [
+            (e.last_used, k) for k, e in self._entries.items() if e.refs == 0 and not e.opening
+        ]
+        return min(idle)[1] if idle else None
+
+    async def _close_entry(self, key: tuple[str, str]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            await entry.layer.close()
+            logger.debug(f"Closed memory layer: {key[0]}")
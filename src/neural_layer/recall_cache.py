@@ -0,0 +1,95 @@
+"""
+RecallCache: Memoize pipeline query results within a session.
+Keyed on normalized query text + depth, with LRU/TTL eviction and write invalidation.
+"""
+from __future__ import annotations
+
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+@dataclass
+class _Entry:
+    result: Any
+    generation: int
+    stored_at: float
+
+
+class RecallCache:
+    """
+    Query-result cache for ReflexPipeline lookups.
+
+    Every memory write bumps `generation`; entries stored under an older
+    generation are stale and treated as misses. Results of None are cached
+    too, so repeated misses also skip the traversal.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 60.0):
+        """
+        Args:
+            max_entries: Max cached queries (0 = disabled)
+            ttl_seconds: Max age of a cached result
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.generation = 0
+        self._entries: OrderedDict[tuple[str, int | None], _Entry] = OrderedDict()
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Lowercase and collapse whitespace so near-identical queries share a key."""
+        return _WHITESPACE.sub(" ", query).strip().lower()
+
+    def get(self, query: str, depth: int | None = None) -> tuple[bool, Any]:
+        """
+        Returns:
+            (hit, result). result is only meaningful when hit is True.
+        """
+        key = (self.normalize(query), depth)
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        if (
+            entry.generation != self.generation
+            or time.monotonic() - entry.stored_at > self.ttl_seconds
+        ):
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, entry.result
+
+    def put(
+        self,
+        query: str,
+        depth: int | None,
+        result: Any,
+        generation: int | None = None,
+    ) -> None:
+        """
+        Store a result. Pass the generation observed before running the query,
+        so a write that happened meanwhile makes the entry stale immediately.
+        """
+        if self.max_entries <= 0:
+            return
+        key = (self.normalize(query), depth)
+        self._entries[key] = _Entry(
+            result=result,
+            generation=self.generation if generation is None else generation,
+            stored_at=time.monotonic(),
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        """Mark every cached result stale — call on each memory write."""
+        self.generation += 1
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
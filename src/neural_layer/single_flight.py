@@ -0,0 +1,56 @@
+"""
+SingleFlight: Deduplicate concurrent identical async calls.
+Concurrent callers with the same key share one in-flight task instead of each doing the work.
+"""
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+
+@dataclass(slots=True)
+class _Flight:
+    task: asyncio.Future
+    waiters: int = 0
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls by key.
+
+    The first caller for a key starts fn() in its own task; every caller
+    (including the first) awaits that task and gets the same result (or
+    exception). Cancelling one caller does not cancel the others — the task is
+    only cancelled once no caller is waiting on it any more.
+    Once the call finishes the key is forgotten — this is not a cache.
+    """
+
+    def __init__(self):
+        self._in_flight: dict[str, _Flight] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn() once for all concurrent callers with this key."""
+        flight = self._in_flight.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._in_flight[key] = flight
+            flight.task.add_done_callback(lambda _, f=flight: self._forget(key, f))
+
+        flight.waiters += 1
+        try:
+            # shield: a cancelled caller must not cancel the shared call
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Every caller gave up; nobody wants the result
+                flight.task.cancel()
+
+    def in_flight(self) -> int:
+        """Number of keys currently being computed."""
+        return len(self._in_flight)
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        if self._in_flight.get(key) is flight:
+            del self._in_flight[key]
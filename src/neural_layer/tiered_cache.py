@@ -0,0 +1,59 @@
+"""
+TieredCache: Bounded in-process LRU in front of an optional SQLite file.
+Shared scaffolding of ToolResultCache and SummaryCache; subclasses own the table and queries.
+"""
+from __future__ import annotations
+
+import sqlite3
+from collections import OrderedDict
+from pathlib import Path
+from typing import Generic, TypeVar
+
+V = TypeVar("V")
+
+# Seconds a statement waits on another process's lock before raising
+BUSY_TIMEOUT_SECONDS = 0.25
+
+
+class TieredCache(Generic[V]):
+    """
+    Two tiers:
+    - Bounded in-process LRU (hot entries, no I/O)
+    - Persistent SQLite file, created with `schema` on first use
+
+    The connection is synchronous and used from the event loop thread, so the
+    file must not be one whose lock is held across awaits (e.g. the brain DB).
+    """
+
+    def __init__(self, db_path: str | None, schema: str, lru_entries: int):
+        """
+        Args:
+            db_path: SQLite file for the persistent tier. None = in-process only.
+            schema: CREATE statements run when the file is opened
+            lru_entries: Max entries kept in the LRU tier
+        """
+        self.db_path = db_path
+        self._schema = schema
+        self._lru_entries = lru_entries
+        self._lru: OrderedDict[str, V] = OrderedDict()
+        self._conn: sqlite3.Connection | None = None
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _remember(self, key: str, value: V) -> None:
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        while len(self._lru) > self._lru_entries:
+            self._lru.popitem(last=False)
+
+    def _connection(self) -> sqlite3.Connection | None:
+        if self.db_path is None:
+            return None
+        if self._conn is None:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT_SECONDS)
+            self._conn.executescript(self._schema)
+        return self._conn
@@ -0,0 +1,164 @@
+"""
+ToolResultCache: Exact-match index for tool results.
+Sits in front of the semantic recall path so repeat tool calls are O(1) lookups.
+
+Two tiers:
+- Bounded in-process LRU (hot entries, no I/O)
+- Persistent SQLite table (survives restarts, shared by processes on the same file)
+
+The persistent tier uses its own file, not the brain DB: the brain's connection
+holds its write transaction across awaits, and this tier's synchronous writes
+run on the event loop thread, so they must never wait on that lock.
+"""
+from __future__ import annotations
+
+import logging
+import sqlite3
+import time
+from dataclasses import dataclass
+
+from .tiered_cache import TieredCache
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tool_cache_index (
+    cache_key TEXT PRIMARY KEY,
+    tool_name TEXT NOT NULL,
+    result TEXT NOT NULL,
+    expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_tool_cache_expires ON tool_cache_index(expires_at);
+"""
+
+
+@dataclass
+class CachedToolResult:
+    tool_name: str
+    result: str
+    expires_at: float | None  # Unix timestamp, None = never expires
+
+    def is_expired(self, now: float | None = None) -> bool:
+        if self.expires_at is None:
+            return False
+        return (now if now is not None else time.time()) >= self.expires_at
+
+
+class ToolResultCache(TieredCache[CachedToolResult]):
+    """
+    Exact-key tool result cache.
+
+    Keys are the cache keys computed by NeuralMemoryLayer for (tool_name, args).
+    Lookups hit the LRU first, then the SQLite table; SQLite hits are promoted
+    into the LRU. Expired entries are treated as misses and dropped on read.
+    SQLite errors (e.g. a lock held by another process) are logged and never
+    raised: a failed read is a miss, a failed write keeps the LRU tier only.
+    """
+
+    def __init__(self, db_path: str | None = None, max_entries: int = 1024):
+        """
+        Args:
+            db_path: SQLite file for the persistent tier. None = in-process only.
+            max_entries: Maximum number of entries kept in the LRU tier.
+        """
+        super().__init__(db_path, _SCHEMA, lru_entries=max_entries)
+        self.max_entries = max_entries
+
+    # ─── Public API ─────────────────────────────────────────────
+
+    def get(self, cache_key: str) -> str | None:
+        """Return cached result for key, or None on miss/expiry."""
+        now = time.time()
+
+        entry = self._lru.get(cache_key)
+        if entry is not None:
+            if entry.is_expired(now):
+                self.invalidate(cache_key)
+                return None
+            self._lru.move_to_end(cache_key)
+            return entry.result
+
+        conn = self._connection()
+        if conn is None:
+            return None
+        try:
+            row = conn.execute(
+                "SELECT tool_name, result, expires_at FROM tool_cache_index WHERE cache_key = ?",
+                (cache_key,),
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Tool cache read failed for {cache_key}: {e}")
+            return None
+        if row is None:
+            return None
+
+        entry = CachedToolResult(tool_name=row[0], result=row[1], expires_at=row[2])
+        if entry.is_expired(now):
+            self.invalidate(cache_key)
+            return None
+        self._remember(cache_key, entry)
+        return entry.result
+
+    def put(
+        self,
+        cache_key: str,
+        tool_name: str,
+        result: str,
+        ttl_seconds: float | None = None,
+    ) -> None:
+        """Insert or replace an entry in both tiers. ttl_seconds=None = never expires."""
+        expires_at = None if ttl_seconds is None else time.time() + ttl_seconds
+        self._remember(cache_key, CachedToolResult(tool_name, result, expires_at))
+
+        conn = self._connection()
+        if conn is None:
+            return
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO tool_cache_index "
+                    "(cache_key, tool_name, result, expires_at) VALUES (?, ?, ?, ?)",
+                    (cache_key, tool_name, result, expires_at),
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Tool cache write failed for {tool_name}: {e}")
+
+    def invalidate(self, cache_key: str) -> None:
+        """Remove an entry from both tiers."""
+        self._lru.pop(cache_key, None)
+        conn = self._connection()
+        if conn is None:
+            return
+        try:
+            with conn:
+                conn.execute("DELETE FROM tool_cache_index WHERE cache_key = ?", (cache_key,))
+        except sqlite3.Error as e:
+            logger.warning(f"Tool cache delete failed for {cache_key}: {e}")
+
+    def purge_expired(self, limit: int = 1000) -> int:
+        """
+        Delete up to `limit` expired entries from both tiers.
+
+        Returns:
+            Number of entries deleted from the persistent tier
+            (LRU tier count when there is no persistent tier).
+        """
+        now = time.time()
+        expired = [k for k, e in self._lru.items() if e.is_expired(now)][:limit]
+        for cache_key in expired:
+            del self._lru[cache_key]
+
+        conn = self._connection()
+        if conn is None:
+            return len(expired)
+        with conn:
+            cursor = conn.execute(
+                "DELETE FROM tool_cache_index WHERE cache_key IN ("
+                "SELECT cache_key FROM tool_cache_index "
+                "WHERE expires_at IS NOT NULL AND expires_at <= ? LIMIT ?)",
+                (now, limit),
+            )
+        return cursor.rowcount
+
+    def __len__(self) -> int:
+        return len(self._lru)
@@ -0,0 +1,190 @@
+"""
+WriteBehindQueue: Persist memories in the background so store_* calls return immediately.
+A bounded worker pool drains the queue in batches; overflow is spilled to disk.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from dataclasses import asdict
+from pathlib import Path
+from typing import Awaitable, Callable
+
+from .write_buffer import MemoryRecord
+
+logger = logging.getLogger(__name__)
+
+WriteFn = Callable[[list[MemoryRecord]], Awaitable[None]]
+
+
+class WriteBehindQueue:
+    """
+    Asyncio write-behind queue for memory records.
+
+    Flow:
+    1. submit() enqueues and returns at once
+    2. Workers take up to batch_size records and write them in one call
+    3. Queue full → spill to a JSONL file; with no spill file, or once it holds
+       max_spill records, the caller waits for queue space (backpressure)
+    4. Failed batches are spilled too (dropped and logged when the spill file is
+       full); spilled records are re-queued when workers go idle after a
+       successful write, and on join()/close()
+    """
+
+    def __init__(
+        self,
+        write_fn: WriteFn,
+        max_queue: int = 1000,
+        workers: int = 2,
+        batch_size: int = 50,
+        spill_path: str | None = None,
+        retry_delay: float = 1.0,
+        max_spill: int = 10000,
+    ):
+        """
+        Args:
+            write_fn: Async function persisting a batch of records
+            max_queue: Max queued records before spilling/backpressure
+            workers: Number of concurrent worker tasks
+            batch_size: Max records per write_fn call
+            spill_path: JSONL overflow file. None = block caller when full
+            retry_delay: Seconds a worker pauses after a failed batch
+            max_spill: Max records kept in the spill file
+        """
+        self._write_fn = write_fn
+        self.max_queue = max_queue
+        self.workers = workers
+        self.batch_size = batch_size
+        self.spill_path = spill_path
+        self.retry_delay = retry_delay
+        self.max_spill = max_spill
+        self._spilled = 0  # Records in the spill file
+        self._queue: asyncio.Queue[MemoryRecord] | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    # ─── Public API ─────────────────────────────────────────────
+
+    async def submit(self, record: MemoryRecord) -> None:
+        """Enqueue a record. Only waits when the queue is full and the spill file is full or unset."""
+        queue = self._ensure_started()
+        if not queue.full():
+            queue.put_nowait(record)
+        elif self._spill_room() > 0:
+            self._spill([record])
+        else:
+            await queue.put(record)  # Backpressure
+
+    async def join(self) -> None:
+        """
+        Wait until queued records are written, with one retry pass over spilled ones.
+        Records that still fail stay in the spill file for the next run.
+        """
+        queue = self._ensure_started()
+        await queue.join()
+        self._reload_spill()
+        # Always join again: an idle worker may have just re-queued spilled records
+        await queue.join()
+
+    async def close(self) -> None:
+        """Drain the queue, then stop workers — call on shutdown."""
+        if self._queue is None:
+            return
+        await self.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def pending(self) -> int:
+        """Number of records queued in memory (excluding spilled ones)."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    # ─── Workers ────────────────────────────────────────────────
+
+    def _ensure_started(self) -> asyncio.Queue[MemoryRecord]:
+        if self._queue is None:
+            self._spilled = self._count_spilled()
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._tasks = [
+                asyncio.create_task(self._worker()) for _ in range(self.workers)
+            ]
+        return self._queue
+
+    async def _worker(self) -> None:
+        queue = self._queue
+        failed = False
+        while True:
+            # Pick up spilled records when idle, unless the backend is failing
+            if queue.empty() and not failed:
+                self._reload_spill()
+            batch = [await queue.get()]
+            while len(batch) < self.batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+
+            failed = False
+            try:
+                await self._write_fn(batch)
+            except Exception as e:
+                failed = True
+                logger.error(f"Write-behind batch of {len(batch)} failed: {e}")
+                room = self._spill_room()
+                if room:
+                    self._spill(batch[:room])
+                if len(batch) > room:
+                    logger.error(f"Dropped {len(batch) - room} memories: spill file full or unset")
+            finally:
+                for _ in batch:
+                    queue.task_done()
+            if failed:
+                await asyncio.sleep(self.retry_delay)
+
+    # ─── Spill File ─────────────────────────────────────────────
+
+    def _spill_room(self) -> int:
+        """Records that still fit in the spill file (0 when there is none)."""
+        if self.spill_path is None:
+            return 0
+        return max(0, self.max_spill - self._spilled)
+
+    def _count_spilled(self) -> int:
+        """Records left in the spill file by a previous run."""
+        if self.spill_path is None:
+            return 0
+        try:
+            with open(self.spill_path, encoding="utf-8") as f:
+                return sum(1 for line in f if line.strip())
+        except FileNotFoundError:
+            return 0
+
+    def _spill(self, records: list[MemoryRecord]) -> None:
+        path = Path(self.spill_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(asdict(record), ensure_ascii=False) + "\n")
+        self._spilled += len(records)
+        logger.debug(f"Spilled {len(records)} memories to {self.spill_path}")
+
+    def _reload_spill(self) -> bool:
+        """Move spilled records back into the queue. Returns True if any were found."""
+        if self.spill_path is None or self._queue is None:
+            return False
+        path = Path(self.spill_path)
+        if not path.exists():
+            return False
+        lines = path.read_text(encoding="utf-8").splitlines()
+        path.unlink()
+        self._spilled = 0
+        records = [MemoryRecord(**json.loads(line)) for line in lines if line]
+
+        overflow = []
+        for record in records:
+            if self._queue.full():
+                overflow.append(record)
+            else:
+                self._queue.put_nowait(record)
+        if overflow:
+            self._spill(overflow)
+        return bool(records)
@@ -0,0 +1,136 @@
+"""
+WriteBuffer: Queue memories of mixed types and flush them to NeuralMemory in batches.
+One flush = one storage transaction, instead of one commit per stored memory.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class MemoryRecord:
+    content: str
+    memory_type: str  # "decision", "context", "insight", "fact"
+    expires_hours: float | None = None
+    metadata: dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def decision(
+        cls, content: str, context: str = "", expires_hours: int | None = None
+    ) -> "MemoryRecord":
+        full_content = f"[DECISION] {content}"
+        if context:
+            full_content += f" | Context: {context}"
+        return cls(full_content, "decision", expires_hours)
+
+    @classmethod
+    def context(cls, content: str, expires_hours: int = 24) -> "MemoryRecord":
+        return cls(content, "context", expires_hours)
+
+    @classmethod
+    def insight(cls, content: str, expires_hours: int | None = None) -> "MemoryRecord":
+        return cls(f"[INSIGHT] {content}", "insight", expires_hours)
+
+    @classmethod
+    def fact(cls, content: str, expires_hours: float | None = None) -> "MemoryRecord":
+        return cls(content, "fact", expires_hours)
+
+
+FlushFn = Callable[[list[MemoryRecord]], Awaitable[None]]
+
+# Upper bound (seconds) of the backoff between retries of a failed flush
+MAX_RETRY_DELAY_SECONDS = 60.0
+
+
+class WriteBuffer:
+    """
+    Buffer memory records and flush on size or time threshold.
+
+    Flow:
+    1. add() appends a record
+    2. Buffer reaches max_items → flush immediately
+    3. Otherwise flush max_delay_seconds after the first pending record
+    4. flush()/close() drain whatever is pending (call on shutdown)
+    5. A failed flush keeps its records and retries on its own, with
+       exponential backoff, so no later add() is needed to write them
+    """
+
+    def __init__(
+        self,
+        flush_fn: FlushFn,
+        max_items: int = 50,
+        max_delay_seconds: float = 1.0,
+    ):
+        """
+        Args:
+            flush_fn: Async function writing a batch of records in one transaction
+            max_items: Flush when this many records are pending
+            max_delay_seconds: Flush at most this long after a record was added
+        """
+        self._flush_fn = flush_fn
+        self.max_items = max_items
+        self.max_delay_seconds = max_delay_seconds
+        self._pending: list[MemoryRecord] = []
+        self._timer: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+        self._failures = 0  # Consecutive failed flushes
+
+    async def add(self, record: MemoryRecord) -> None:
+        """Queue a record, flushing if the size threshold is reached."""
+        self._pending.append(record)
+        if len(self._pending) >= self.max_items:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def flush(self) -> int:
+        """
+        Write all pending records in one batch.
+
+        Returns:
+            Number of records flushed.
+        """
+        if self._timer is not None and self._timer is not asyncio.current_task():
+            self._timer.cancel()
+        self._timer = None
+
+        if not self._pending:
+            return 0
+        records, self._pending = self._pending, []
+
+        async with self._lock:
+            try:
+                await self._flush_fn(records)
+            except Exception:
+                # Keep records for the next flush instead of dropping them
+                self._pending[:0] = records
+                self._failures += 1
+                if self._timer is None:
+                    delay = min(
+                        self.max_delay_seconds * 2 ** self._failures, MAX_RETRY_DELAY_SECONDS
+                    )
+                    self._timer = asyncio.create_task(self._flush_later(delay))
+                raise
+        self._failures = 0
+        logger.debug(f"Flushed {len(records)} memories")
+        return len(records)
+
+    async def close(self) -> None:
+        """Flush pending records — call on shutdown."""
+        await self.flush()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    async def _flush_later(self, delay: float | None = None) -> None:
+        await asyncio.sleep(self.max_delay_seconds if delay is None else delay)
+        self._timer = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Background flush failed: {e}")
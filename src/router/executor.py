@@ -0,0 +1,137 @@
+"""
+RoutedMemoryExecutor: Execute a SmartMemoryRouter decision against real backends.
+Replaces hand-written "try neural, check confidence, fall back" dispatch in every caller.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from .router import MemorySource, RoutingDecision, SmartMemoryRouter
+
+logger = logging.getLogger(__name__)
+
+# async (query, min_confidence) -> content, or None if nothing meets the threshold.
+# NeuralMemoryLayer.recall fits this signature directly.
+RecallFn = Callable[[str, float], Awaitable[str | None]]
+
+# async (query) -> fresh content from the real tool
+ToolFn = Callable[[str], Awaitable[str]]
+
+
+@dataclass
+class ExecutionResult:
+    content: str | None
+    source: MemorySource | None  # Backend that answered (None = no answer)
+    decision: RoutingDecision
+
+
+class RoutedMemoryExecutor:
+    """
+    Route a query, then dispatch it.
+
+    - NEURAL: neural, fallback to traditional
+    - TRADITIONAL: traditional only
+    - TOOL_CALL: neural cache check at the decision threshold, fallback to tool
+    - BOTH: hedged — neural and traditional run concurrently, the first answer
+      meeting the threshold wins and the other request is cancelled
+    """
+
+    def __init__(
+        self,
+        neural: RecallFn,
+        traditional: RecallFn | None = None,
+        tool: ToolFn | None = None,
+        router: SmartMemoryRouter | None = None,
+        hedge_delay: float = 0.0,
+    ):
+        """
+        Args:
+            neural: Neural recall function (e.g. NeuralMemoryLayer.recall)
+            traditional: Traditional memory / RAG search function
+            tool: Real tool call for real-time queries
+            router: Router to use (default: new SmartMemoryRouter)
+            hedge_delay: Seconds to give neural a head start for BOTH queries
+                (0 = start both at once)
+        """
+        self.neural = neural
+        self.traditional = traditional
+        self.tool = tool
+        self.router = router or SmartMemoryRouter()
+        self.hedge_delay = hedge_delay
+
+    async def execute(self, query: str) -> ExecutionResult:
+        """Route query and return the first answer meeting the decision threshold."""
+        decision = self.router.route(query)
+        threshold = decision.confidence_threshold
+
+        if decision.source == MemorySource.BOTH:
+            content, source = await self._hedged(query, threshold)
+            return ExecutionResult(content, source, decision)
+
+        if decision.source == MemorySource.TRADITIONAL:
+            content = await self._recall(self.traditional, query, threshold)
+            return self._traditional_result(content, decision)
+
+        # NEURAL and TOOL_CALL both try neural memory (the cache) first
+        content = await self.neural(query, threshold)
+        if content is not None:
+            return ExecutionResult(content, MemorySource.NEURAL, decision)
+
+        if decision.source == MemorySource.TOOL_CALL and self.tool is not None:
+            return ExecutionResult(await self.tool(query), MemorySource.TOOL_CALL, decision)
+
+        content = await self._recall(self.traditional, query, threshold)
+        return self._traditional_result(content, decision)
+
+    async def execute_many(self, queries: list[str]) -> list[ExecutionResult]:
+        """Execute several queries concurrently, results in input order."""
+        return list(await asyncio.gather(*(self.execute(q) for q in queries)))
+
+    # ─── Helpers ────────────────────────────────────────────────
+
+    @staticmethod
+    def _traditional_result(content: str | None, decision: RoutingDecision) -> ExecutionResult:
+        source = MemorySource.TRADITIONAL if content is not None else None
+        return ExecutionResult(content, source, decision)
+
+    @staticmethod
+    async def _recall(fn: RecallFn | None, query: str, threshold: float) -> str | None:
+        if fn is None:
+            return None
+        return await fn(query, threshold)
+
+    async def _hedged(
+        self, query: str, threshold: float
+    ) -> tuple[str | None, MemorySource | None]:
+        if self.traditional is None:
+            content = await self.neural(query, threshold)
+            return content, MemorySource.NEURAL if content is not None else None
+
+        async def _delayed_traditional() -> str | None:
+            if self.hedge_delay > 0:
+                await asyncio.sleep(self.hedge_delay)
+            return await self.traditional(query, threshold)
+
+        tasks = {
+            asyncio.create_task(self.neural(query, threshold)): MemorySource.NEURAL,
+            asyncio.create_task(_delayed_traditional()): MemorySource.TRADITIONAL,
+        }
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Prefer neural when both finish in the same tick
+                for task in sorted(done, key=lambda t: tasks[t] != MemorySource.NEURAL):
+                    if task.exception() is not None:
+                        logger.warning(f"{tasks[task].value} backend failed: {task.exception()}")
+                        continue
+                    if task.result() is not None:
+                        return task.result(), tasks[task]
+            return None, None
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
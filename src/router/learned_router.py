@@ -0,0 +1,181 @@
+"""
+LearnedRouter: Statistical query router trained from recall outcomes.
+Hashed-feature online logistic regression (one model per source), falling back to the regex rules.
+"""
+from __future__ import annotations
+
+import json
+import math
+import re
+import zlib
+from collections import defaultdict
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable
+
+from .router import MemorySource, RoutingDecision, SmartMemoryRouter
+
+if TYPE_CHECKING:
+    from ..cache_policy.policy_engine import PolicyEngine
+
+_WORD = re.compile(r"[a-z0-9_']+")
+
+# Sources the model chooses between, cheapest first (BOTH is the "don't know" fallback)
+LEARNED_SOURCES = (MemorySource.NEURAL, MemorySource.TRADITIONAL, MemorySource.TOOL_CALL)
+
+# Confidence threshold to use with each learned source (same as the regex rules);
+# also the predicted hit probability a source needs to be routed to
+SOURCE_THRESHOLDS: dict[MemorySource, float] = {
+    MemorySource.NEURAL: 0.65,
+    MemorySource.TRADITIONAL: 0.7,
+    MemorySource.TOOL_CALL: 0.85,
+}
+
+
+def hash_features(query: str, n_features: int) -> list[int]:
+    """Unigram + bigram features hashed into n_features buckets."""
+    words = _WORD.findall(query.lower())
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    return sorted({zlib.crc32(g.encode()) % n_features for g in grams})
+
+
+class LearnedRouter(SmartMemoryRouter):
+    """
+    Predicts, per source, the probability that querying it yields a hit.
+
+    Flow:
+    1. record_outcome() after each memory query / tool call (online update)
+    2. route() tries sources cheapest first (NEURAL → TRADITIONAL → TOOL_CALL)
+       and picks the first whose predicted hit probability clears its threshold,
+       so a reliable tool call never wins over memory that is good enough
+    3. Too few outcomes, or no source likely to hit → regex rules (SmartMemoryRouter)
+    """
+
+    def __init__(
+        self,
+        n_features: int = 2 ** 18,
+        learning_rate: float = 0.2,
+        min_samples: int = 20,
+        min_probability: float = 0.5,
+        cache_size: int = 1024,
+        policy_engine: PolicyEngine | None = None,
+    ):
+        """
+        Args:
+            n_features: Hash buckets for query features
+            learning_rate: SGD step size for online updates
+            min_samples: Outcomes needed before the model is used
+            min_probability: Min predicted hit probability to trust the model
+            cache_size: Cache size for fallback regex decisions
+            policy_engine: Source of per-source thresholds (overrides SOURCE_THRESHOLDS)
+        """
+        super().__init__(cache_size=cache_size, policy_engine=policy_engine)
+        self.n_features = n_features
+        self.learning_rate = learning_rate
+        self.min_samples = min_samples
+        self.min_probability = min_probability
+        self.samples = 0
+        self._weights: dict[MemorySource, dict[int, float]] = {
+            source: defaultdict(float) for source in LEARNED_SOURCES
+        }
+        self._bias: dict[MemorySource, float] = {source: 0.0 for source in LEARNED_SOURCES}
+
+    # ─── Routing ────────────────────────────────────────────────
+
+    def route(self, query: str) -> RoutingDecision:
+        """Route with the learned model, or the regex rules when it is not confident."""
+        if self.samples < self.min_samples:
+            return super().route(query)
+
+        self._sync_policy()
+        features = hash_features(query, self.n_features)
+        for source in LEARNED_SOURCES:
+            threshold = self._thresholds.get(source, SOURCE_THRESHOLDS[source])
+            probability = self.predict(source, features)
+            if probability >= max(threshold, self.min_probability):
+                return RoutingDecision(
+                    source=source,
+                    reason=f"Learned route → {source.value} (p_hit={probability:.2f})",
+                    confidence_threshold=threshold,
+                )
+        return super().route(query)
+
+    def predict(self, source: MemorySource, features: list[int] | str) -> float:
+        """Predicted probability that querying source yields a hit."""
+        if isinstance(features, str):
+            features = hash_features(features, self.n_features)
+        weights = self._weights[source]
+        score = self._bias[source] + sum(weights.get(f, 0.0) for f in features)
+        return 1.0 / (1.0 + math.exp(-max(-30.0, min(30.0, score))))
+
+    # ─── Training ───────────────────────────────────────────────
+
+    def record_outcome(
+        self,
+        query: str,
+        source: MemorySource,
+        hit: bool,
+        confidence: float = 1.0,
+    ) -> None:
+        """
+        Online update from one logged outcome.
+
+        Args:
+            query: Query that was routed
+            source: Backend that was actually queried
+            hit: Whether it returned a usable answer
+            confidence: Confidence of the answer (hits are weighted by it)
+        """
+        if source not in self._weights:
+            return
+        self._update(query, source, hit, confidence)
+        self.samples += 1
+
+    def fit(
+        self,
+        outcomes: Iterable[tuple[str, MemorySource, bool, float]],
+        epochs: int = 3,
+    ) -> None:
+        """Train from logged (query, source, hit, confidence) outcomes."""
+        outcomes = [o for o in outcomes if o[1] in self._weights]
+        for _ in range(epochs):
+            for query, source, hit, confidence in outcomes:
+                self._update(query, source, hit, confidence)
+        self.samples += len(outcomes)
+
+    def _update(self, query: str, source: MemorySource, hit: bool, confidence: float) -> None:
+        """One SGD step on the log-loss of the source's hit model."""
+        features = hash_features(query, self.n_features)
+        target = max(0.0, min(1.0, confidence)) if hit else 0.0
+        step = self.learning_rate * (target - self.predict(source, features))
+
+        weights = self._weights[source]
+        for f in features:
+            weights[f] += step
+        self._bias[source] += step
+
+    # ─── Persistence ────────────────────────────────────────────
+
+    def save(self, path: str) -> None:
+        data = {
+            "n_features": self.n_features,
+            "samples": self.samples,
+            "bias": {s.value: b for s, b in self._bias.items()},
+            "weights": {
+                s.value: {str(f): w for f, w in weights.items() if w}
+                for s, weights in self._weights.items()
+            },
+        }
+        Path(path).write_text(json.dumps(data))
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "LearnedRouter":
+        data = json.loads(Path(path).read_text())
+        router = cls(n_features=data["n_features"], **kwargs)
+        router.samples = data["samples"]
+        for value, bias in data["bias"].items():
+            router._bias[MemorySource(value)] = bias
+        for value, weights in data["weights"].items():
+            router._weights[MemorySource(value)].update(
+                {int(f): w for f, w in weights.items()}
+            )
+        return router
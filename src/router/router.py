@@ -4,8 +4,14 @@ SmartMemoryRouter: Decide whether to query NeuralMemory or Traditional Memory.
 from __future__ import annotations
 
 import re
-from dataclasses import dataclass
+from collections import OrderedDict
+from dataclasses import dataclass, replace
 from enum import Enum
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ..cache_policy.policy_engine import CachePolicy, PolicyEngine
 
 
 class MemorySource(Enum):
@@ -15,33 +21,81 @@ class MemorySource(Enum):
     TOOL_CALL = "tool_call"  # Not in memory, need real tool call
 
 
-@dataclass
+@dataclass(frozen=True)
 class RoutingDecision:
     source: MemorySource
     reason: str
     confidence_threshold: float = 0.7
+    matched: frozenset[str] = frozenset()  # Every query category found in the text
+
+
+# Keywords to recognize query types (category → alternatives)
+_CATEGORY_KEYWORDS: dict[str, tuple[str, ...]] = {
+    "decision": ("why", "reason", "decided", "chose", "picked", "selected", "because"),
+    "causal": ("caused", "led to", "resulted", "consequence", "impact", "affect"),
+    "tool": ("current", "latest", "now", "today", "file content", "output of", "result of"),
+    "document": ("documentation", "readme", "spec", "api reference", "how to use"),
+}
+
+# One alternation with a named group per category → a single scan reports all matches
+_QUERY_PATTERN = re.compile(
+    r"\b(?:"
+    + "|".join(
+        f"(?P<{category}>{'|'.join(re.escape(k) for k in keywords)})"
+        for category, keywords in _CATEGORY_KEYWORDS.items()
+    )
+    + r")\b",
+    re.IGNORECASE,
+)
 
 
-# Patterns to recognize query types
-_DECISION_PATTERNS = re.compile(
-    r"\b(why|reason|decided|chose|picked|selected|because)\b",
-    re.IGNORECASE
-)
+# Config routing key → source whose confidence threshold it sets
+ROUTING_THRESHOLD_KEYS: dict[str, MemorySource] = {
+    "neural_vs_tool_threshold": MemorySource.TOOL_CALL,
+    "neural_vs_traditional_threshold": MemorySource.TRADITIONAL,
+}
 
-_CAUSAL_PATTERNS = re.compile(
-    r"\b(caused|led to|resulted|consequence|impact|affect)\b",
-    re.IGNORECASE
-)
 
-_TOOL_PATTERNS = re.compile(
-    r"\b(current|latest|now|today|file content|output of|result of)\b",
-    re.IGNORECASE
-)
+def match_categories(query: str) -> frozenset[str]:
+    """Scan query once and return every category that matched."""
+    return frozenset(m.lastgroup for m in _QUERY_PATTERN.finditer(query))
 
-_DOCUMENT_PATTERNS = re.compile(
-    r"\b(documentation|readme|spec|api reference|how to use)\b",
-    re.IGNORECASE
-)
+
+@lru_cache(maxsize=None)
+def _decision_for(matched: frozenset[str]) -> RoutingDecision:
+    # Causal / decision queries → NeuralMemory (strength: causal traversal)
+    if "decision" in matched or "causal" in matched:
+        return RoutingDecision(
+            source=MemorySource.NEURAL,
+            reason="Causal/decision query → NeuralMemory graph traversal",
+            confidence_threshold=0.65,
+            matched=matched,
+        )
+
+    # Real-time / current state → need real tool call
+    if "tool" in matched:
+        return RoutingDecision(
+            source=MemorySource.TOOL_CALL,
+            reason="Real-time query → check cache first, fallback to tool",
+            confidence_threshold=0.85,  # Need higher confidence for fresh data
+            matched=matched,
+        )
+
+    # Document / reference queries → Traditional RAG
+    if "document" in matched:
+        return RoutingDecision(
+            source=MemorySource.TRADITIONAL,
+            reason="Document query → Traditional RAG",
+            matched=matched,
+        )
+
+    # Default: try NeuralMemory first, fallback to Traditional
+    return RoutingDecision(
+        source=MemorySource.BOTH,
+        reason="General query → try both sources",
+        confidence_threshold=0.6,
+        matched=matched,
+    )
 
 
 class SmartMemoryRouter:
@@ -49,36 +103,54 @@ class SmartMemoryRouter:
     Route query to correct memory backend to optimize tokens.
     """
 
+    def __init__(self, cache_size: int = 1024, policy_engine: PolicyEngine | None = None):
+        """
+        Args:
+            cache_size: Max routing decisions remembered for repeated queries (0 = off)
+            policy_engine: Source of confidence thresholds (config routing section);
+                config changes apply to the next route()
+        """
+        self.cache_size = cache_size
+        self.policy_engine = policy_engine
+        self._cache: OrderedDict[str, RoutingDecision] = OrderedDict()
+        self._policy: CachePolicy | None = None
+        self._thresholds: dict[MemorySource, float] = {}
+
     def route(self, query: str) -> RoutingDecision:
         """
         Analyze query and decide appropriate memory source.
         """
-        # Causal / decision queries → NeuralMemory (strength: causal traversal)
-        if _DECISION_PATTERNS.search(query) or _CAUSAL_PATTERNS.search(query):
-            return RoutingDecision(
-                source=MemorySource.NEURAL,
-                reason="Causal/decision query → NeuralMemory graph traversal",
-                confidence_threshold=0.65,
-            )
-
-        # Real-time / current state → need real tool call
-        if _TOOL_PATTERNS.search(query):
-            return RoutingDecision(
-                source=MemorySource.TOOL_CALL,
-                reason="Real-time query → check cache first, fallback to tool",
-                confidence_threshold=0.85,  # Need higher confidence for fresh data
-            )
-
-        # Document / reference queries → Traditional RAG
-        if _DOCUMENT_PATTERNS.search(query):
-            return RoutingDecision(
-                source=MemorySource.TRADITIONAL,
-                reason="Document query → Traditional RAG",
-            )
-
-        # Default: try NeuralMemory first, fallback to Traditional
-        return RoutingDecision(
-            source=MemorySource.BOTH,
-            reason="General query → try both sources",
-            confidence_threshold=0.6,
-        )
+        self._sync_policy()
+        decision = self._cache.get(query)
+        if decision is not None:
+            self._cache.move_to_end(query)
+            return decision
+
+        decision = _decision_for(match_categories(query))
+        threshold = self._thresholds.get(decision.source)
+        if threshold is not None and threshold != decision.confidence_threshold:
+            decision = replace(decision, confidence_threshold=threshold)
+        if self.cache_size > 0:
+            self._cache[query] = decision
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return decision
+
+    def route_many(self, queries: list[str]) -> list[RoutingDecision]:
+        """Route a batch of queries, in order."""
+        return [self.route(query) for query in queries]
+
+    def _sync_policy(self) -> None:
+        """Reload thresholds (and drop cached decisions) when the policy changed."""
+        if self.policy_engine is None:
+            return
+        policy = self.policy_engine.policy
+        if policy is self._policy:
+            return
+        self._policy = policy
+        self._thresholds = {
+            source: float(policy.routing[key])
+            for key, source in ROUTING_THRESHOLD_KEYS.items()
+            if key in policy.routing
+        }
+        self._cache.clear()
@@ -4,41 +4,180 @@ Instead of keeping full history (expensive in tokens), compress periodically int
 """
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import logging
+import re
+from collections import OrderedDict
 from typing import TYPE_CHECKING, Any
 
+from ..assembler.tokenizer import Tokenizer, truncate_to_tokens
+from ..neural_layer.single_flight import SingleFlight
+from ..neural_layer.write_buffer import MemoryRecord
+from .summary_cache import SummaryCache
+
 if TYPE_CHECKING:
+    from ..cache_policy.policy_engine import PolicyEngine
     from ..neural_layer.neural_layer import NeuralMemoryLayer
 
 logger = logging.getLogger(__name__)
 
-# Number of messages to keep after compress (recent window)
-RECENT_WINDOW = 5
+# Compress when session history exceeds this many tokens
+COMPRESS_TOKEN_THRESHOLD = 4000
+
+# Tokens of most recent messages to keep after compress (the last message is always kept)
+RECENT_TOKEN_BUDGET = 1500
+
+# Hard cap on summarizer input (previous summary + new messages), in tokens
+MAX_SUMMARY_INPUT_TOKENS = 3000
+
+# Each message gets at least this many tokens of summarizer input
+MIN_MESSAGE_TOKENS = 32
+
+# Settings read from the config's session section (with their defaults)
+SESSION_SETTINGS = {
+    "compress_threshold_tokens": COMPRESS_TOKEN_THRESHOLD,
+    "recent_tokens": RECENT_TOKEN_BUDGET,
+    "max_summary_input_tokens": MAX_SUMMARY_INPUT_TOKENS,
+}
+
+# Expiry (hours) of memories extracted from a session, by type; None = never expires
+EXTRACTED_TTL_HOURS: dict[str, int | None] = {
+    "decision": None,
+    "insight": 24 * 30,
+    "fact": 24 * 7,
+    "context": 48,  # the [SESSION_SUMMARY] itself
+}
+
+# "LABEL: text" lines of the summarizer output (optional leading bullet)
+_EXTRACT_LINE = re.compile(r"^\s*(?:[-*]\s*)?(SUMMARY|DECISION|INSIGHT|FACT)\s*:\s*(.+)$", re.I)
+
+_EXTRACT_FORMAT = """Answer in this format, one item per line (omit empty types):
+SUMMARY: <summary>
+DECISION: <what was decided> | <why>
+INSIGHT: <lesson learned, bug pattern, gotcha>
+FACT: <stable fact about the project>"""
+
+# Memoized chunk summaries (map step), by chunk content hash
+CHUNK_SUMMARY_CACHE_SIZE = 256
+
+_CHUNK_PROMPT = """Summarize this part of a longer conversation. Keep the decisions, findings, completed work, and open items. Be concise — max 3-4 sentences.
+
+Conversation: {conversation}
+
+Summary:"""
+
+_SUMMARY_PROMPT = """Summarize the key decisions, findings, and progress from this conversation segment. Focus on: what was decided, what was learned, what was completed, what's still pending. Be concise — max 3-4 sentences.
+
+Conversation: {conversation}
 
-# Compress when number of messages exceeds this threshold
-COMPRESS_THRESHOLD = 20
+{format}"""
+
+_ROLLING_SUMMARY_PROMPT = """Update the session summary with the new conversation segment. Keep the key decisions, findings, and progress from both; drop what is superseded. Be concise — max 3-4 sentences. List only decisions, insights and facts from the new conversation.
+
+Previous summary: {summary}
+
+New conversation: {conversation}
+
+{format}"""
 
 
 class SessionCompressor:
     """
     Automatically compress session history when too long.
-    
+
     Flow:
-    1. Monitor messages in session
-    2. When exceeding COMPRESS_THRESHOLD → summarize via LLM
-    3. Save summary into NeuralMemory
-    4. Keep only RECENT_WINDOW most recent messages
+    1. Monitor the token size of messages in session
+    2. When exceeding the token threshold → fold the older messages into the
+       rolling summary via LLM (previous summary + new messages only)
+    3. Save summary, and the decisions/insights/facts extracted with it as typed
+       memories (per-type TTLs), into NeuralMemory in one batch
+    4. Keep only the most recent messages that fit the recent token budget
+
+    Long segments (over the summarizer input cap) are map-reduced: split into
+    token-bounded chunks, chunks summarized concurrently, then the chunk
+    summaries folded into the rolling summary.
+
+    Background mode: steps 2-3 run in a worker task and maybe_compress returns
+    the trimmed list at once. Triggers while the worker runs are coalesced into
+    its next summary; failed summaries are retried without dropping messages.
     """
 
-    def __init__(self, neural_memory: "NeuralMemoryLayer", llm_call_fn):
+    def __init__(
+        self,
+        neural_memory: "NeuralMemoryLayer",
+        llm_call_fn,
+        compress_threshold_tokens: int | None = None,
+        recent_tokens: int | None = None,
+        max_summary_input_tokens: int | None = None,
+        tokenizer: Tokenizer | None = None,
+        background: bool = False,
+        max_retries: int = 3,
+        retry_delay: float = 1.0,
+        chunk_tokens: int | None = None,
+        max_concurrency: int = 4,
+        ttl_hours: dict[str, int | None] | None = None,
+        summary_cache: SummaryCache | None = None,
+        policy_engine: PolicyEngine | None = None,
+    ):
         """
         Args:
             neural_memory: Instance of NeuralMemoryLayer
             llm_call_fn: Async function to call LLM for summarization
                 Signature: async (prompt: str) -> str
+            compress_threshold_tokens: Compress when history exceeds this many tokens
+            recent_tokens: Token budget of recent messages kept after compress
+            max_summary_input_tokens: Hard cap on summarizer input size
+                (these three: explicit value, else the config's session
+                section via policy_engine, else SESSION_SETTINGS)
+            tokenizer: Token counter (default: the memory layer's tokenizer)
+            background: Summarize and store in a worker task; maybe_compress
+                never waits on the LLM
+            max_retries: Consecutive failed summaries before the worker stops
+                (messages stay queued for the next trigger or flush())
+            retry_delay: Seconds between retries
+            chunk_tokens: Max tokens per map-step chunk (default: max_summary_input_tokens)
+            max_concurrency: Max concurrent chunk summarization calls
+            ttl_hours: Per-type expiry overrides for extracted memories
+                (see EXTRACTED_TTL_HOURS)
+            summary_cache: Prompt → summary cache; identical segments (retries,
+                forked sessions) skip the LLM call
+            policy_engine: Source of the session settings; config changes apply
+                on the next maybe_compress
         """
         self.memory = neural_memory
         self.llm_call = llm_call_fn
+        self.policy_engine = policy_engine
+        self._policy = None
+        # Explicit settings always win over the config
+        self._explicit = {
+            name: value
+            for name, value in (
+                ("compress_threshold_tokens", compress_threshold_tokens),
+                ("recent_tokens", recent_tokens),
+                ("max_summary_input_tokens", max_summary_input_tokens),
+            )
+            if value is not None
+        }
+        self._chunk_tokens_arg = chunk_tokens
+        for name, default in SESSION_SETTINGS.items():
+            setattr(self, name, self._explicit.get(name, default))
+        self.tokenizer = tokenizer or neural_memory.tokenizer
+        self.background = background
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        # Rolling summary of everything compressed so far in this session
+        self.summary: str | None = None
+        # Background mode: messages trimmed from the session, not yet summarized
+        self._pending: list[dict[str, Any]] = []
+        self._worker: asyncio.Task | None = None
+        self.chunk_tokens = chunk_tokens or self.max_summary_input_tokens
+        self._chunk_semaphore = asyncio.Semaphore(max_concurrency)
+        self._chunk_flight = SingleFlight()
+        self._chunk_summaries: OrderedDict[str, str] = OrderedDict()
+        self.ttl_hours = {**EXTRACTED_TTL_HOURS, **(ttl_hours or {})}
+        self.summary_cache = summary_cache
+        self._sync_policy()
 
     async def maybe_compress(
         self,
@@ -54,46 +193,260 @@ class SessionCompressor:
         Returns:
             List of messages after compression (or original if not needed).
         """
-        if len(messages) < COMPRESS_THRESHOLD:
+        self._sync_policy()
+        counts = self.tokenizer.count_many([self._render(m) for m in messages])
+        if sum(counts) <= self.compress_threshold_tokens:
             return messages
 
-        logger.info(
-            f"Compressing session: {len(messages)} messages → {RECENT_WINDOW} recent"
-        )
-
-        # Part to compress (exclude last RECENT_WINDOW)
-        to_compress = messages[:-RECENT_WINDOW]
-        recent = messages[-RECENT_WINDOW:]
+        split = self._recent_start(counts)
+        to_compress = messages[:split]
+        recent = messages[split:]
+        if not to_compress:
+            return messages
 
-        # Summarize using LLM
-        summary = await self._summarize(to_compress)
+        if self.background:
+            # Snapshot: the caller may mutate its message dicts after we return
+            self._pending.extend(dict(m) for m in to_compress)
+            self._ensure_worker()
+            logger.info(
+                f"Queued {len(to_compress)} messages for background compression. "
+                f"Kept {len(recent)} recent messages."
+            )
+            return recent
 
-        # Save summary into NeuralMemory
-        await self.memory.store_context(
-            content=f"[SESSION_SUMMARY] {summary}",
-            expires_hours=48,
+        logger.info(
+            f"Compressing session: {sum(counts)} tokens in {len(messages)} messages "
+            f"→ {len(recent)} recent"
         )
 
+        await self._compress(to_compress)
+
         logger.info(
             f"Compressed {len(to_compress)} messages into episodic memory. "
             f"Kept {len(recent)} recent messages."
         )
 
-        # Return only recent messages (save ~80% tokens)
         return recent
 
+    async def flush(self) -> None:
+        """Wait for background compression to finish (e.g. before shutdown)."""
+        if self._pending:
+            self._ensure_worker()
+        if self._worker is not None:
+            await self._worker
+
+    async def close(self) -> None:
+        """Finish background compression and close the summary cache."""
+        await self.flush()
+        if self.summary_cache is not None:
+            self.summary_cache.close()
+
+    @property
+    def pending(self) -> int:
+        """Messages waiting for background compression."""
+        return len(self._pending)
+
+    def reset(self) -> None:
+        """Forget the rolling summary (e.g. new session)."""
+        self.summary = None
+
+    # ─── Helpers ────────────────────────────────────────────────
+
+    def _sync_policy(self) -> None:
+        """Apply the config's session settings when the policy was (re)loaded."""
+        if self.policy_engine is None:
+            return
+        policy = self.policy_engine.policy
+        if policy is self._policy:
+            return
+        self._policy = policy
+        for name, default in SESSION_SETTINGS.items():
+            if name not in self._explicit:
+                setattr(self, name, int(policy.session.get(name, default)))
+        self.chunk_tokens = self._chunk_tokens_arg or self.max_summary_input_tokens
+
+    async def _compress(self, messages: list[dict[str, Any]]) -> None:
+        """
+        Fold messages into the rolling summary and save it, plus the typed
+        decisions/insights/facts extracted with it, in one batched write.
+        """
+        summary, records = extract_records(await self._summarize(messages), self.ttl_hours)
+        records.append(
+            MemoryRecord.context(f"[SESSION_SUMMARY] {summary}", self.ttl_hours["context"])
+        )
+        await self.memory.store_many(records)
+        # Only advance once stored, so a retry folds into the same previous summary
+        self.summary = summary
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run_worker())
+
+    async def _run_worker(self) -> None:
+        failures = 0
+        while self._pending:
+            # Everything queued so far goes into one summary (coalesced triggers)
+            batch, self._pending = self._pending, []
+            try:
+                await self._compress(batch)
+                failures = 0
+                logger.info(f"Compressed {len(batch)} messages into episodic memory.")
+            except Exception as e:
+                self._pending[:0] = batch
+                failures += 1
+                logger.warning(
+                    f"Background compression failed ({failures}/{self.max_retries}): {e}"
+                )
+                if failures >= self.max_retries:
+                    return
+                await asyncio.sleep(self.retry_delay)
+
+    def _recent_start(self, counts: list[int]) -> int:
+        """Index of the first recent message kept (the last message always is)."""
+        used = 0
+        for i in range(len(counts) - 1, -1, -1):
+            used += counts[i]
+            if used > self.recent_tokens and i < len(counts) - 1:
+                return i + 1
+        return 0
+
     async def _summarize(self, messages: list[dict[str, Any]]) -> str:
-        """Use LLM to summarize conversation into episodic memory."""
-        # Format messages into text
-        conversation_text = " ".join(
-            f"{m['role'].upper()}: {str(m.get('content', ''))[:300]}"
-            for m in messages
+        """Use LLM to fold messages into the rolling summary (map-reduce if too long)."""
+        summary = self._previous_summary()
+        budget = self._conversation_budget(summary)
+
+        texts = [self._render(m) for m in messages]
+        counts = self.tokenizer.count_many(texts)
+        # Map: summarize chunks concurrently; repeat on the summaries until they fit
+        while sum(counts) > budget:
+            chunks = self._chunk(texts, counts)
+            summaries = list(await asyncio.gather(*(self._summarize_chunk(c) for c in chunks)))
+            summary_counts = self.tokenizer.count_many(summaries)
+            if sum(summary_counts) >= sum(counts):
+                break  # Not shrinking; the prompt cap trims the rest
+            texts, counts = summaries, summary_counts
+
+        prompt = self._build_prompt(texts, summary, budget)
+        return await self._call_llm(prompt)
+
+    async def _call_llm(self, prompt: str) -> str:
+        if self.summary_cache is None:
+            return await self.llm_call(prompt)
+        summary = self.summary_cache.get(prompt)
+        if summary is None:
+            summary = await self.llm_call(prompt)
+            if summary:
+                self.summary_cache.put(prompt, summary)
+        return summary
+
+    def _previous_summary(self) -> str | None:
+        if self.summary is None:
+            return None
+        return truncate_to_tokens(self.summary, self.max_summary_input_tokens // 3, self.tokenizer)
+
+    def _conversation_budget(self, summary: str | None) -> int:
+        if summary is None:
+            return self.max_summary_input_tokens
+        return self.max_summary_input_tokens - self.tokenizer.count(summary)
+
+    def _build_prompt(self, texts: list[str], summary: str | None, budget: int) -> str:
+        # Cap each text at a fair share of the budget, then the whole text
+        share = max(MIN_MESSAGE_TOKENS, budget // max(1, len(texts)))
+        conversation = truncate_to_tokens(
+            " ".join(truncate_to_tokens(t, share, self.tokenizer) for t in texts),
+            budget,
+            self.tokenizer,
+        )
+
+        if summary is None:
+            return _SUMMARY_PROMPT.format(conversation=conversation, format=_EXTRACT_FORMAT)
+        return _ROLLING_SUMMARY_PROMPT.format(
+            summary=summary, conversation=conversation, format=_EXTRACT_FORMAT
         )
 
-        prompt = f"""Summarize the key decisions, findings, and progress from this conversation segment. Focus on: what was decided, what was learned, what was completed, what's still pending. Be concise — max 3-4 sentences.
+    # ─── Map-Reduce ─────────────────────────────────────────────
 
-Conversation: {conversation_text}
+    def _chunk(self, texts: list[str], counts: list[int]) -> list[str]:
+        """Group consecutive texts into chunks of at most chunk_tokens."""
+        chunks: list[str] = []
+        current: list[str] = []
+        used = 0
+        for text, count in zip(texts, counts):
+            if count > self.chunk_tokens:
+                text = truncate_to_tokens(text, self.chunk_tokens, self.tokenizer)
+                count = self.chunk_tokens
+            if current and used + count > self.chunk_tokens:
+                chunks.append(" ".join(current))
+                current, used = [], 0
+            current.append(text)
+            used += count
+        if current:
+            chunks.append(" ".join(current))
+        return chunks
 
-Summary:"""
+    async def _summarize_chunk(self, chunk: str) -> str:
+        """Summarize one chunk; memoized by content hash, identical chunks share one call."""
+        key = hashlib.blake2b(chunk.encode(), digest_size=16).hexdigest()
+        cached = self._chunk_summaries.get(key)
+        if cached is not None:
+            self._chunk_summaries.move_to_end(key)
+            return cached
+
+        async def _call() -> str:
+            async with self._chunk_semaphore:
+                summary = await self._call_llm(_CHUNK_PROMPT.format(conversation=chunk))
+            self._chunk_summaries[key] = summary
+            while len(self._chunk_summaries) > CHUNK_SUMMARY_CACHE_SIZE:
+                self._chunk_summaries.popitem(last=False)
+            return summary
+
+        return await self._chunk_flight.do(key, _call)
+
+    @staticmethod
+    def _render(message: dict[str, Any]) -> str:
+        return f"{message['role'].upper()}: {message.get('content', '')}"
+
+
+def extract_records(
+    text: str,
+    ttl_hours: dict[str, int | None] = EXTRACTED_TTL_HOURS,
+) -> tuple[str, list[MemoryRecord]]:
+    """
+    Split summarizer output into the summary and typed memory records.
+    Output without any labels is taken as a plain summary.
+
+    Returns:
+        (summary, records) — records are decisions, insights and facts.
+    """
+    summary_lines: list[str] = []
+    records: list[MemoryRecord] = []
+    seen: set[tuple[str, str]] = set()
+    labelled = False
+
+    for line in text.splitlines():
+        match = _EXTRACT_LINE.match(line)
+        if match is None:
+            continue
+        labelled = True
+        label, content = match.group(1).lower(), match.group(2).strip()
+        if label == "summary":
+            summary_lines.append(content)
+            continue
+        if (label, content.lower()) in seen:
+            continue
+        seen.add((label, content.lower()))
+        if label == "decision":
+            decision, _, reason = content.partition("|")
+            records.append(
+                MemoryRecord.decision(decision.strip(), reason.strip(), ttl_hours["decision"])
+            )
+        elif label == "insight":
+            records.append(MemoryRecord.insight(content, ttl_hours["insight"]))
+        else:
+            records.append(MemoryRecord.fact(content, ttl_hours["fact"]))
 
-        return await self.llm_call(prompt)
+    if not labelled:
+        return text.strip(), []
+    # No SUMMARY line: the typed items are the summary
+    summary = " ".join(summary_lines) or " ".join(r.content for r in records)
+    return summary, records
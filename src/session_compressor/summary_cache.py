@@ -0,0 +1,141 @@
+"""
+SummaryCache: Persistent prompt → summary cache for SessionCompressor.
+Retried or forked sessions send byte-identical summarization prompts; answer them without an LLM call.
+
+Two tiers:
+- Bounded in-process LRU (hot entries, no I/O)
+- Persistent SQLite table, bounded to max_entries (least recently used evicted)
+"""
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import time
+
+from ..neural_layer.tiered_cache import TieredCache
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS summary_cache (
+    prompt_hash TEXT PRIMARY KEY,
+    summary TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_summary_cache_last_used ON summary_cache(last_used);
+"""
+
+
+class SummaryCache(TieredCache[str]):
+    """
+    Summaries keyed by a hash of the full prompt (template, previous summary
+    and conversation segment), so any change to the input is a miss.
+
+    LRU-tier hits do no I/O: their use time is recorded in memory and written
+    to disk before the next eviction (and on close), so the on-disk eviction
+    order still reflects them.
+    """
+
+    def __init__(
+        self,
+        db_path: str | None = None,
+        max_entries: int = 10000,
+        memory_entries: int = 256,
+    ):
+        """
+        Args:
+            db_path: SQLite file for the persistent tier. None = in-process only.
+            max_entries: Max entries kept on disk (least recently used evicted)
+            memory_entries: Max entries kept in the LRU tier
+        """
+        super().__init__(db_path, _SCHEMA, lru_entries=memory_entries)
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        # LRU-tier hits not yet written to last_used on disk
+        self._touched: dict[str, float] = {}
+
+    # ─── Public API ─────────────────────────────────────────────
+
+    @staticmethod
+    def key(prompt: str) -> str:
+        return hashlib.blake2b(prompt.encode(), digest_size=16).hexdigest()
+
+    def get(self, prompt: str) -> str | None:
+        """Return the cached summary for prompt, or None on miss."""
+        key = self.key(prompt)
+        summary = self._lru.get(key)
+        if summary is not None:
+            self._lru.move_to_end(key)
+            if self.db_path is not None:
+                self._touched[key] = time.time()
+            self.hits += 1
+            return summary
+
+        conn = self._connection()
+        row = None
+        if conn is not None:
+            row = conn.execute(
+                "SELECT summary FROM summary_cache WHERE prompt_hash = ?", (key,)
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        with conn:
+            conn.execute(
+                "UPDATE summary_cache SET last_used = ? WHERE prompt_hash = ?",
+                (time.time(), key),
+            )
+        self._remember(key, row[0])
+        self.hits += 1
+        return row[0]
+
+    def put(self, prompt: str, summary: str) -> None:
+        """Insert or replace a summary in both tiers, evicting beyond max_entries."""
+        key = self.key(prompt)
+        self._remember(key, summary)
+
+        conn = self._connection()
+        if conn is None:
+            return
+        with conn:
+            self._write_touched(conn)
+            conn.execute(
+                "INSERT OR REPLACE INTO summary_cache (prompt_hash, summary, last_used) "
+                "VALUES (?, ?, ?)",
+                (key, summary, time.time()),
+            )
+            conn.execute(
+                "DELETE FROM summary_cache WHERE prompt_hash IN ("
+                "SELECT prompt_hash FROM summary_cache ORDER BY last_used DESC "
+                "LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def close(self) -> None:
+        if self._conn is not None and self._touched:
+            with self._conn:
+                self._write_touched(self._conn)
+        super().close()
+
+    def __len__(self) -> int:
+        conn = self._connection()
+        if conn is None:
+            return len(self._lru)
+        return conn.execute("SELECT COUNT(*) FROM summary_cache").fetchone()[0]
+
+    # ─── Helpers ────────────────────────────────────────────────
+
+    def _write_touched(self, conn: sqlite3.Connection) -> None:
+        """Write pending LRU-hit use times (inside the caller's transaction)."""
+        if self._touched:
+            conn.executemany(
+                "UPDATE summary_cache SET last_used = ? WHERE prompt_hash = ?",
+                [(used, key) for key, used in self._touched.items()],
+            )
+            self._touched.clear()
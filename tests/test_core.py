@@ -11,14 +11,85 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src import (
     NeuralMemoryLayer,
+    MemoryRecord,
+    LearnedRouter,
+    NeuralMemoryPool,
+    RoutedMemoryExecutor,
     SmartMemoryRouter,
     ContextAssembler,
     ContextBlock,
+    IncrementalAssembler,
+    SessionCompressor,
+    BPETokenizer,
+    CachedTokenizer,
     MemorySource,
     should_cache_tool,
     get_cache_ttl,
+    get_cache_ttl_seconds,
     get_confidence_threshold,
+    canonicalize_args,
+    make_cache_key,
 )
+from src.assembler.dedup import estimate_jaccard, minhash_signature
+from src.assembler.tokenizer import HeuristicTokenizer, truncate_to_tokens
+from src.cache_policy.adaptive_ttl import AdaptiveTTL
+from src.cache_policy.policy_engine import PolicyEngine
+from src.session_compressor.summary_cache import SummaryCache
+from src.neural_layer.garbage_collector import vacuum_database
+from src.neural_layer.memory_backend import InMemoryBackend
+from src.neural_layer.recall_cache import RecallCache
+from src.neural_layer.single_flight import SingleFlight
+from src.neural_layer.tool_cache import ToolResultCache
+from src.neural_layer.write_behind import WriteBehindQueue
+from src.neural_layer.write_buffer import WriteBuffer
+
+
+class _FakeResult:
+    def __init__(self, context, confidence=0.9):
+        self.context = context
+        self.confidence = confidence
+
+
+class _FakeBackend:
+    """Stands in for SQLiteStorage, MemoryEncoder and ReflexPipeline."""
+
+    def __init__(self):
+        self.encoded = []
+        self.queries = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def disable_auto_save(self):
+        pass
+
+    def enable_auto_save(self):
+        pass
+
+    async def batch_save(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def encode(self, content, **kwargs):
+        self.encoded.append(content)
+
+    async def query(self, query, depth=None):
+        self.queries += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        matches = [c for c in self.encoded if any(w in c.lower() for w in query.lower().split())]
+        return _FakeResult(" ".join(matches)) if matches else None
+
+
+async def _layer_with_fake_backend(**kwargs):
+    backend = _FakeBackend()
+    memory = NeuralMemoryLayer("test-project", db_path=":memory:", **kwargs)
+    memory._storage = memory._encoder = memory._pipeline = backend
+    memory._initialized = True
+    return memory, backend
 
 
 class TestSmartMemoryRouter:
@@ -54,6 +125,149 @@ class TestSmartMemoryRouter:
         result = self.router.route("Tell me about the project")
         assert result.source == MemorySource.BOTH
 
+    def test_route_reports_all_matched_categories(self):
+        """Test a single scan reports every matching category."""
+        result = self.router.route("What's the current reason for the readme?")
+        assert result.matched == {"decision", "tool", "document"}
+        assert result.source == MemorySource.NEURAL  # Precedence unchanged
+
+    def test_route_cache(self):
+        """Test repeated queries reuse the cached decision within the bound."""
+        router = SmartMemoryRouter(cache_size=2)
+        first = router.route("Why SQLite?")
+        assert router.route("Why SQLite?") is first
+        router.route("latest output")
+        router.route("api reference")
+        assert len(router._cache) == 2
+
+    def test_route_many(self):
+        """Test batch routing keeps input order."""
+        results = self.router.route_many(["Why SQLite?", "Show the spec", "hello"])
+        assert [r.source for r in results] == [
+            MemorySource.NEURAL,
+            MemorySource.TRADITIONAL,
+            MemorySource.BOTH,
+        ]
+
+
+class TestLearnedRouter:
+    """Tests for the statistical router."""
+
+    def _outcomes(self):
+        for topic in ["config", "build", "deploy", "test", "lint"]:
+            yield (f"what's the current reason {topic} fails", MemorySource.TOOL_CALL, True, 0.9)
+            yield (f"what's the current reason {topic} fails", MemorySource.NEURAL, False, 0.0)
+            yield (f"why did we choose {topic} tool", MemorySource.NEURAL, True, 0.9)
+            yield (f"why did we choose {topic} tool", MemorySource.TOOL_CALL, False, 0.0)
+
+    def test_falls_back_to_regex_until_trained(self):
+        """Test the regex rules are used before min_samples outcomes."""
+        router = LearnedRouter(min_samples=5)
+        result = router.route("what's the current reason")
+        assert result.source == MemorySource.NEURAL
+        assert "Causal/decision" in result.reason
+
+    def test_learns_from_outcomes(self):
+        """Test outcomes fix the regex misroute of current-state questions."""
+        router = LearnedRouter(min_samples=5)
+        router.fit(self._outcomes(), epochs=5)
+        assert router.samples == 20
+        assert router.route("what's the current reason deploy fails").source == MemorySource.TOOL_CALL
+        assert router.route("why did we choose sqlite tool").source == MemorySource.NEURAL
+        # Nothing learned about documents → no confident source → regex rules
+        assert router.route("api reference").source == MemorySource.TRADITIONAL
+
+    def test_prefers_cheaper_source_that_is_good_enough(self):
+        """Test memory wins over an always-hitting tool call when it clears its threshold."""
+        router = LearnedRouter(min_samples=5)
+        outcomes = []
+        for topic in ["config", "build", "deploy", "test", "lint"]:
+            outcomes.append((f"how do we {topic} the app", MemorySource.NEURAL, True, 0.8))
+            outcomes.append((f"how do we {topic} the app", MemorySource.TOOL_CALL, True, 1.0))
+        router.fit(outcomes, epochs=10)
+        result = router.route("how do we deploy the app")
+        assert result.source == MemorySource.NEURAL
+        assert result.confidence_threshold == 0.65
+
+    def test_online_update_and_persistence(self, tmp_path):
+        """Test record_outcome shifts predictions and models round-trip to disk."""
+        router = LearnedRouter()
+        before = router.predict(MemorySource.TRADITIONAL, "readme install steps")
+        for _ in range(10):
+            router.record_outcome("readme install steps", MemorySource.TRADITIONAL, True, 1.0)
+        after = router.predict(MemorySource.TRADITIONAL, "readme install steps")
+        assert after > before
+
+        path = str(tmp_path / "router.json")
+        router.save(path)
+        loaded = LearnedRouter.load(path)
+        assert loaded.samples == 10
+        assert loaded.predict(MemorySource.TRADITIONAL, "readme install steps") == pytest.approx(after)
+
+
+class TestRoutedMemoryExecutor:
+    """Tests for router-driven dispatch."""
+
+    def setup_method(self):
+        self.calls = []
+
+    def _backend(self, name, content, delay=0.0):
+        async def recall(query, min_confidence):
+            self.calls.append(name)
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                self.calls.append(f"{name}-cancelled")
+                raise
+            return content
+        return recall
+
+    @pytest.mark.asyncio
+    async def test_both_hedged_first_answer_wins(self):
+        """Test BOTH takes the first answer and cancels the slower backend."""
+        executor = RoutedMemoryExecutor(
+            neural=self._backend("neural", "neural ctx", delay=0.2),
+            traditional=self._backend("traditional", "rag ctx", delay=0.01),
+        )
+        result = await executor.execute("Tell me about the project")
+        assert result.source == MemorySource.TRADITIONAL
+        assert result.content == "rag ctx"
+        assert "neural-cancelled" in self.calls
+
+    @pytest.mark.asyncio
+    async def test_both_waits_for_answer_meeting_threshold(self):
+        """Test a fast miss does not win over a slower hit."""
+        executor = RoutedMemoryExecutor(
+            neural=self._backend("neural", "neural ctx", delay=0.02),
+            traditional=self._backend("traditional", None),
+        )
+        result = await executor.execute("Tell me about the project")
+        assert result.source == MemorySource.NEURAL
+
+    @pytest.mark.asyncio
+    async def test_tool_call_checks_cache_first(self):
+        """Test TOOL_CALL uses the neural cache before calling the tool."""
+        async def tool(query):
+            self.calls.append("tool")
+            return "fresh"
+
+        hit = RoutedMemoryExecutor(neural=self._backend("neural", "cached"), tool=tool)
+        assert (await hit.execute("current file content")).content == "cached"
+        miss = RoutedMemoryExecutor(neural=self._backend("neural", None), tool=tool)
+        result = await miss.execute("current file content")
+        assert result.source == MemorySource.TOOL_CALL
+        assert self.calls == ["neural", "neural", "tool"]
+
+    @pytest.mark.asyncio
+    async def test_with_neural_memory_layer(self):
+        """Test NeuralMemoryLayer.recall plugs in as the neural backend."""
+        memory = NeuralMemoryLayer("test-project", in_memory=True)
+        await memory.store_decision("Chose SQLite for portability")
+        executor = RoutedMemoryExecutor(neural=memory.recall)
+        result = await executor.execute("Why SQLite?")
+        assert result.source == MemorySource.NEURAL
+        assert "SQLite" in result.content
+
 
 class TestContextAssembler:
     """Tests for ContextAssembler."""
@@ -99,6 +313,140 @@ class TestContextAssembler:
         result = self.assembler.assemble(blocks)
         assert "[truncated]" in result or len(result) < 500
 
+    def test_optimal_packs_small_blocks_over_one_large(self):
+        """Test optimal packing keeps several small blocks a large one would crowd out."""
+        assembler = ContextAssembler(max_context_tokens=100, strategy="optimal")
+        blocks = [
+            ContextBlock(source="system", content="System rules", priority=1, token_estimate=20),
+            ContextBlock(source="big", content="B" * 280, priority=2, token_estimate=70),
+        ] + [
+            ContextBlock(source=f"small{i}", content=f"Small fact {i}", priority=3, token_estimate=20)
+            for i in range(3)
+        ]
+        greedy = self.assembler.assemble(blocks)
+        assert "[SMALL0]" not in greedy
+
+        result = assembler.assemble(blocks)
+        assert "[SYSTEM]" in result
+        assert all(f"[SMALL{i}]" in result for i in range(3))
+        assert "[BIG]" not in result
+        assert result.index("[SYSTEM]") < result.index("[SMALL0]")
+
+    def test_optimal_prefers_confident_recent_blocks(self):
+        """Test confidence and recency feed block value."""
+        import time
+
+        assembler = ContextAssembler(max_context_tokens=30, strategy="optimal")
+        now = time.time()
+        blocks = [
+            ContextBlock("old", "Old memory", 2, 20, confidence=0.9, timestamp=now - 72 * 3600),
+            ContextBlock("new", "New memory", 2, 20, confidence=0.9, timestamp=now),
+        ]
+        result = assembler.assemble(blocks)
+        assert "[NEW]" in result and "[OLD]" not in result
+
+    def test_truncation_at_sentence_boundary(self):
+        """Test truncation cuts at the last sentence that fits."""
+        assembler = ContextAssembler(max_context_tokens=60, strategy="optimal")
+        content = "First sentence is here. Second sentence is here. " * 10
+        blocks = [ContextBlock("neural", content, 1, 125)]
+        result = assembler.assemble(blocks)
+        assert result.endswith("here.... [truncated]")
+
+    def test_block_frozen_and_slotted(self):
+        """Test blocks are immutable and carry no per-instance __dict__."""
+        import dataclasses
+
+        block = ContextBlock("neural", "Test content", 1, 10)
+        assert not hasattr(block, "__dict__")
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            block.priority = 2
+
+    def test_lazy_token_counts(self):
+        """Test blocks without token_estimate are counted once, in one batch."""
+        tokenizer = _WordTokenizer()
+        assembler = ContextAssembler(max_context_tokens=100, tokenizer=tokenizer)
+        blocks = [ContextBlock("a", "one two three", 1), ContextBlock("b", "four five", 2)]
+        assembler.assemble(blocks)
+        calls = tokenizer.calls
+        assert assembler.block_tokens(blocks[0]) == 3
+        assembler.assemble(blocks)
+        assert tokenizer.calls == calls
+
+    def test_lazy_token_counts_per_tokenizer(self):
+        """Test a shared block is recounted by an assembler with another tokenizer."""
+        block = ContextBlock("a", "one two three four five six seven eight", 1)
+        words = ContextAssembler(tokenizer=_WordTokenizer())
+        chars = ContextAssembler(tokenizer=HeuristicTokenizer())
+        assert words.block_tokens(block) == 8
+        assert chars.block_tokens(block) == HeuristicTokenizer().count(block.content)
+        assert words.block_tokens(block) == 8
+
+    def test_assemble_segments_and_buffer(self):
+        """Test segment and buffer assembly match the joined string."""
+        import io
+
+        blocks = [
+            ContextBlock("system", "Rules", 1, 5),
+            ContextBlock("neural", "Memory", 2, 5),
+        ]
+        segments = self.assembler.assemble_segments(blocks)
+        assert segments[1] is blocks[0].content  # referenced, not copied
+        buffer = io.StringIO()
+        buffer.write("Context: ")
+        written = self.assembler.assemble_into(buffer, blocks)
+        assert buffer.getvalue() == "Context: " + self.assembler.assemble(blocks)
+        assert written == len("".join(segments))
+
+    def test_dedup_keeps_highest_priority_copy(self):
+        """Test near-duplicate blocks are dropped, keeping the highest priority."""
+        fact = "We chose SQLite with WAL mode for storage because it is lightweight and portable"
+        blocks = [
+            ContextBlock("traditional", fact + ".", 2, 20),
+            ContextBlock("neural", fact, 1, 20),
+            ContextBlock("session", "The user prefers tabs over spaces in Python files", 3, 12),
+        ]
+        result = self.assembler.assemble(blocks)
+        assert "[NEURAL]" in result and "[SESSION]" in result
+        assert "[TRADITIONAL]" not in result
+
+        no_dedup = ContextAssembler(max_context_tokens=100, dedup_threshold=None)
+        assert "[TRADITIONAL]" in no_dedup.assemble(blocks)
+
+    def test_dedup_scales_to_hundreds_of_blocks(self):
+        """Test dedup stays cheap for a few hundred blocks (no all-pairs scan)."""
+        import random
+        import time
+
+        rng = random.Random(0)
+        vocab = [f"word{i}" for i in range(5000)]
+        texts = [" ".join(rng.choices(vocab, k=60)) for _ in range(300)]
+        blocks = [ContextBlock("neural", t, 1 + i % 4, 60) for i, t in enumerate(texts)]
+        blocks += [ContextBlock("traditional", t + " again", 4, 61) for t in texts[:20]]
+        assembler = ContextAssembler(max_context_tokens=50_000, strategy="optimal")
+
+        start = time.perf_counter()
+        result = assembler.assemble(blocks)
+        first = time.perf_counter() - start
+        start = time.perf_counter()
+        assembler.assemble(blocks)  # Sketches cached on the blocks
+        repeat = time.perf_counter() - start
+        assert "[TRADITIONAL]" not in result
+        assert first < 0.25 and repeat < 0.15
+
+    def test_minhash_similarity(self):
+        """Test MinHash estimates high similarity for near-duplicates only."""
+        a = minhash_signature("the quick brown fox jumps over the lazy dog near the river bank")
+        b = minhash_signature("the quick brown fox jumps over the lazy dog near the river")
+        c = minhash_signature("completely different text about database migrations and schemas")
+        assert estimate_jaccard(a, b) > 0.8
+        assert estimate_jaccard(a, c) == 0.0
+
+    def test_unknown_strategy(self):
+        """Test invalid strategy is rejected."""
+        with pytest.raises(ValueError):
+            ContextAssembler(strategy="random")
+
     def test_estimate_tokens(self):
         """Test token estimation."""
         text = "This is a test sentence with 8 words"
@@ -106,6 +454,130 @@ class TestContextAssembler:
         assert estimate > 0
         assert isinstance(estimate, int)
 
+    def test_custom_tokenizer(self):
+        """Test assembler counts and truncates with the given tokenizer."""
+        assembler = ContextAssembler(max_context_tokens=60, tokenizer=_WordTokenizer())
+        assert assembler.estimate_tokens("one two three") == 3
+        blocks = assembler.make_blocks([("neural", "word " * 100, 1)])
+        assert blocks[0].token_estimate == 100
+        result = assembler.assemble(blocks)
+        assert result.endswith("[truncated]")
+        assert len(result.split()) <= 60 + 3
+
+
+class TestIncrementalAssembler:
+    """Tests for stable-prefix incremental assembly."""
+
+    def setup_method(self):
+        self.assembler = IncrementalAssembler(max_context_tokens=200)
+        self.system = ContextBlock("system", "Follow the project style guide", 1, 8)
+        self.decision = ContextBlock("neural", "[DECISION] Use SQLite for storage", 1, 9)
+
+    def test_prefix_stable_across_turns(self):
+        """Test the prefix stays byte-identical while volatile blocks change."""
+        first = self.assembler.update([
+            self.system, self.decision, ContextBlock("session", "User asked about caching", 3, 6),
+        ])
+        second = self.assembler.update([
+            ContextBlock("session", "User asked about routing", 3, 6), self.decision, self.system,
+        ])
+        assert second.prefix == first.prefix
+        assert second.reused_segments == 2 and not second.prefix_changed
+        assert second.text.startswith(first.prefix)
+        assert "routing" in second.suffix and "routing" not in second.prefix
+
+    def test_new_stable_blocks_appended(self):
+        """Test new stable blocks are appended after the existing prefix."""
+        first = self.assembler.update([self.decision])
+        second = self.assembler.update([self.system, self.decision])
+        assert second.prefix.startswith(first.prefix)
+        assert second.added == ["[SYSTEM] Follow the project style guide"]
+
+    def test_removed_stable_block(self):
+        """Test a stable block that leaves is reported and ends prefix reuse."""
+        self.assembler.update([self.system, self.decision])
+        result = self.assembler.update([self.decision])
+        assert result.prefix_changed
+        assert result.removed == ["[SYSTEM] Follow the project style guide"]
+        assert result.reused_segments == 0
+
+    def test_prefix_budget(self):
+        """Test stable blocks beyond the prefix budget go to the volatile suffix."""
+        assembler = IncrementalAssembler(max_context_tokens=100, max_prefix_tokens=15)
+        result = assembler.update([self.system, self.decision])
+        assert result.segments == ["[SYSTEM] Follow the project style guide"]
+        assert "[NEURAL]" in result.suffix
+
+
+class _WordTokenizer:
+    """One token per whitespace-separated word."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def count(self, text):
+        return self.count_many([text])[0]
+
+    def count_many(self, texts):
+        self.calls += 1
+        return [len(t.split()) for t in texts]
+
+
+class TestTokenizer:
+    """Tests for token counting."""
+
+    def _vocab(self, tmp_path):
+        import base64
+        tokens = [bytes([b]) for b in range(256)] + [b"he", b"ll", b"hell", b"hello", b" w", b" wo"]
+        path = tmp_path / "vocab.tiktoken"
+        path.write_bytes(b"\n".join(
+            base64.b64encode(t) + b" " + str(rank).encode() for rank, t in enumerate(tokens)
+        ))
+        return str(path)
+
+    def test_bpe_counts(self, tmp_path):
+        """Test BPE merges pieces using the vocab ranks."""
+        tokenizer = BPETokenizer.from_file(self._vocab(tmp_path))
+        assert tokenizer.count("hello") == 1
+        assert tokenizer.count("hello world") == 1 + 4  # " wo" + r, l, d
+        assert tokenizer.count_many(["hello", "hel"]) == [1, 2]
+
+    def test_heuristic_fallback(self):
+        """Test heuristic matches the ~4 chars/token estimate."""
+        assert HeuristicTokenizer().count("x" * 40) == 10
+        assert HeuristicTokenizer().count("") == 1
+
+    def test_cached_counts(self):
+        """Test repeated texts are counted once and batches call the base once."""
+        base = _WordTokenizer()
+        tokenizer = CachedTokenizer(base, max_entries=2)
+        assert tokenizer.count_many(["a b", "c", "a b"]) == [2, 1, 2]
+        assert base.calls == 1
+        assert tokenizer.count("a b") == 2
+        assert base.calls == 1
+        assert tokenizer.hits == 2 and tokenizer.misses == 2  # in-batch duplicate is a hit
+
+    def test_cached_counts_evict_least_recently_used(self):
+        """Test a hit refreshes an entry so it outlives older, unused ones."""
+        base = _WordTokenizer()
+        tokenizer = CachedTokenizer(base, max_entries=2)
+        tokenizer.count("a")
+        tokenizer.count("b")
+        tokenizer.count("a")  # hit: "a" becomes most recent
+        tokenizer.count("c")  # evicts "b"
+        calls = base.calls
+        tokenizer.count("a")
+        assert base.calls == calls
+        tokenizer.count("b")
+        assert base.calls == calls + 1
+
+    def test_truncate_to_tokens(self):
+        """Test truncation fits the budget and prefers sentence ends."""
+        text = "First sentence here. Second sentence is longer than the first."
+        cut = truncate_to_tokens(text, 5, _WordTokenizer())
+        assert cut == "First sentence here."
+        assert truncate_to_tokens(text, 0, _WordTokenizer()) == ""
+
 
 class TestCachePolicy:
     """Tests for cache policy functions."""
@@ -133,6 +605,188 @@ class TestCachePolicy:
         assert get_confidence_threshold("search_web") == 0.75
         assert get_confidence_threshold("unknown_tool") == 0.80  # Default
 
+    def test_ttl_seconds_and_default_ttl(self):
+        """Test second-granularity TTLs and that unlisted tools are not cached."""
+        assert get_cache_ttl_seconds("read_file") == 3600
+        assert get_cache_ttl_seconds("git_branch") == 300
+        assert get_cache_ttl_seconds("mcp_docs_lookup") == 0  # default_ttl_hours
+        assert should_cache_tool("mcp_docs_lookup") is False
+
+    def test_unlisted_tools_are_opt_in(self):
+        """Test only read-only name patterns are cached among unlisted tools."""
+        for tool in ["mcp_fs_read_file", "mcp_jira_get_issue", "mcp_github_list_pulls", "code_search"]:
+            assert should_cache_tool(tool) is True, tool
+        for tool in [
+            "git_commit", "git_push", "git_checkout", "deploy", "bash", "shell",
+            "edit_file", "move_file", "apply_patch", "install_package", "kill_process",
+            "mcp_github_merge_pull_request",
+        ]:
+            assert should_cache_tool(tool) is False, tool
+
+
+class TestPolicyEngine:
+    """Tests for the YAML-driven cache policy engine."""
+
+    CONFIG = """
+tool_cache:
+  default_confidence: 0.8
+  never_cache: [git_status]
+  tools:
+    read_file: {ttl_hours: 1, confidence: 0.9}
+    git_status: {ttl_hours: 5}
+  rules:
+    - match: "mcp_*_read*"
+      ttl_hours: 2
+    - regex: "mcp_.*_write_.*"
+      ttl_hours: 0
+routing:
+  neural_vs_tool_threshold: 0.85
+"""
+
+    def _engine(self, tmp_path, text=CONFIG):
+        path = tmp_path / "memory_config.yaml"
+        path.write_text(text)
+        return PolicyEngine(str(path), check_interval=0), path
+
+    def test_exact_and_pattern_rules(self, tmp_path):
+        """Test exact entries, glob/regex rules, never_cache and defaults."""
+        engine, _ = self._engine(tmp_path)
+        assert engine.lookup("read_file").confidence == 0.9
+        assert engine.lookup("git_status").cacheable is False
+        assert engine.lookup("mcp_fs_read_file").ttl_hours == 2
+        assert engine.lookup("mcp_fs_write_file").cacheable is False
+        assert engine.lookup("unknown").cacheable is False
+        assert engine.lookup("unknown").confidence == 0.8
+        assert engine.policy.routing["neural_vs_tool_threshold"] == 0.85
+
+    def test_router_and_compressor_follow_config(self, tmp_path):
+        """Test routing thresholds and session settings hot-reload from the config."""
+        import os
+
+        engine, path = self._engine(tmp_path, self.CONFIG + "session:\n  recent_tokens: 700\n")
+        router = SmartMemoryRouter(policy_engine=engine)
+        assert router.route("what's the current build output").confidence_threshold == 0.85
+        memory = NeuralMemoryLayer("test-project")
+        compressor = SessionCompressor(memory, None, policy_engine=engine, compress_threshold_tokens=99)
+        assert compressor.recent_tokens == 700
+        assert compressor.compress_threshold_tokens == 99  # Explicit value wins
+
+        path.write_text(
+            self.CONFIG.replace("0.85", "0.95") + "session:\n  recent_tokens: 900\n"
+        )
+        os.utime(path, ns=(1, 10**18))
+        assert router.route("what's the current build output").confidence_threshold == 0.95
+        compressor._sync_policy()
+        assert compressor.recent_tokens == 900
+
+    def test_rule_resolution_memo_is_bounded(self, tmp_path, monkeypatch):
+        """Test unknown tool names do not grow the memo without limit."""
+        from src.cache_policy import policy_engine
+
+        monkeypatch.setattr(policy_engine, "MAX_RESOLVED_NAMES", 3)
+        engine, _ = self._engine(tmp_path)
+        for i in range(10):
+            assert engine.lookup(f"mcp_fs_read_{i}").ttl_hours == 2
+        assert len(engine.policy._resolved) == 3
+
+    def test_policy_immutable(self, tmp_path):
+        """Test the compiled policy cannot be modified."""
+        engine, _ = self._engine(tmp_path)
+        with pytest.raises(TypeError):
+            engine.policy.tools["read_file"] = None
+
+    def test_hot_reload(self, tmp_path):
+        """Test file changes are picked up and invalid configs keep the old policy."""
+        import os
+
+        engine, path = self._engine(tmp_path)
+        before = engine.policy
+        path.write_text(self.CONFIG.replace("ttl_hours: 1, confidence: 0.9", "ttl_hours: 3"))
+        os.utime(path, ns=(1, 10**18))  # Ensure a new mtime on coarse clocks
+        assert engine.lookup("read_file").ttl_hours == 3
+        assert engine.policy is not before
+
+        path.write_text("tool_cache: [unclosed")
+        os.utime(path, ns=(1, 2 * 10**18))
+        assert engine.lookup("read_file").ttl_hours == 3
+
+
+class TestAdaptiveTTL:
+    """Tests for volatility-driven TTLs."""
+
+    def test_stable_results_grow_volatile_shrink(self):
+        """Test unchanged re-fetches lengthen the TTL and changed ones shorten it."""
+        adaptive = AdaptiveTTL(min_ttl_seconds=60, max_ttl_seconds=1000)
+        assert adaptive.observe("read_file", "k1", "same", 300) == 300
+        assert adaptive.observe("read_file", "k1", "same", 300) == 600
+        assert adaptive.observe("read_file", "k1", "same", 300) == 1000  # max bound
+        assert adaptive.observe("read_file", "k1", "changed", 300) == 500
+        assert adaptive.change_rate("read_file") == 1 / 3
+
+        adaptive.observe("search_web", "k2", "a", 100)
+        assert adaptive.observe("search_web", "k2", "b", 100) == 60  # min bound
+        assert adaptive.ttl_for("k2") == 60
+
+    def test_bounds_from_policy(self, tmp_path):
+        """Test per-tool bounds come from the policy config."""
+        path = tmp_path / "memory_config.yaml"
+        path.write_text(
+            "tool_cache:\n  tools:\n    read_file: {ttl_seconds: 30, max_ttl_seconds: 45}\n"
+        )
+        engine = PolicyEngine(str(path))
+        assert engine.lookup("read_file").ttl_seconds == 30
+        adaptive = AdaptiveTTL(engine)
+        adaptive.observe("read_file", "k", "same", 30)
+        assert adaptive.observe("read_file", "k", "same", 30) == 45
+
+    @pytest.mark.asyncio
+    async def test_layer_uses_adaptive_ttl(self):
+        """Test get_or_call_tool caches with the adapted TTL."""
+        import time
+
+        adaptive = AdaptiveTTL(min_ttl_seconds=1, max_ttl_seconds=100)
+        memory = NeuralMemoryLayer("test-project", in_memory=True, adaptive_ttl=adaptive)
+
+        async def call():
+            return "stable"
+
+        await memory.get_or_call_tool("read_file", {"path": "a"}, call, ttl_seconds=10)
+        key = memory._make_cache_key("read_file", canonicalize_args("read_file", {"path": "a"}))
+        memory._tool_cache.invalidate(key)  # expire
+        await memory.get_or_call_tool("read_file", {"path": "a"}, call, ttl_seconds=10)
+        assert adaptive.ttl_for(key) == 20
+        assert memory._tool_cache._lru[key].expires_at > time.time() + 15
+
+
+class TestCacheKey:
+    """Tests for canonical tool argument hashing."""
+
+    def test_key_order_independent(self):
+        """Test reordered dict keys share one cache key."""
+        a = make_cache_key("read_file", {"path": "a", "encoding": "utf8"})
+        b = make_cache_key("read_file", {"encoding": "utf8", "path": "a"})
+        assert a == b
+
+    def test_path_normalization(self):
+        """Test equivalent paths share one cache key for file tools."""
+        assert make_cache_key("read_file", {"path": "./src/../src/a.py"}) == make_cache_key(
+            "read_file", {"path": "src/a.py"}
+        )
+
+    def test_ignored_args(self):
+        """Test ignored args do not change the cache key."""
+        assert make_cache_key("search_web", {"q": "x", "timeout": 5}) == make_cache_key(
+            "search_web", {"q": "x"}
+        )
+        assert make_cache_key("search_web", {"q": "x"}) != make_cache_key("search_web", {"q": "y"})
+
+    def test_json_string_args(self):
+        """Test JSON string args canonicalize like dicts."""
+        assert canonicalize_args("call_api", '{"b": 1, "a": 2}') == canonicalize_args(
+            "call_api", {"a": 2, "b": 1}
+        )
+        assert canonicalize_args("call_api", "  plain  ") == "plain"
+
 
 class TestNeuralMemoryLayer:
     """Tests for NeuralMemoryLayer."""
@@ -146,27 +800,705 @@ class TestNeuralMemoryLayer:
 
     @pytest.mark.asyncio
     async def test_store_decision_mock(self):
-        """Test storing decision in mock mode."""
-        memory = NeuralMemoryLayer("test-project")
+        """Test storing decision without neural_memory installed."""
+        memory = NeuralMemoryLayer("test-project", in_memory=True)
         await memory.initialize()
-        # Should not raise error in mock mode
+        # Should not raise error with the in-memory backend
         await memory.store_decision("Test decision", "Test context")
 
     @pytest.mark.asyncio
     async def test_recall_mock(self):
-        """Test recall in mock mode."""
-        memory = NeuralMemoryLayer("test-project")
+        """Test recall with nothing stored."""
+        memory = NeuralMemoryLayer("test-project", in_memory=True)
         await memory.initialize()
         result = await memory.recall("Test query")
-        assert result is None  # Mock mode returns None
+        assert result is None  # Empty memory returns None
 
     @pytest.mark.asyncio
     async def test_get_task_context_mock(self):
-        """Test task context in mock mode."""
-        memory = NeuralMemoryLayer("test-project")
+        """Test task context with nothing stored."""
+        memory = NeuralMemoryLayer("test-project", in_memory=True)
         await memory.initialize()
         result = await memory.get_task_context("Test task")
-        assert result == ""  # Mock mode returns empty string
+        assert result == ""  # Empty memory returns empty string
+
+    @pytest.mark.asyncio
+    async def test_store_and_recall_in_memory(self):
+        """Test stored memories are recalled by the in-memory backend."""
+        memory = NeuralMemoryLayer("test-project", in_memory=True)
+        await memory.store_decision("Using SQLite for storage", "Lightweight and portable")
+        await memory.store_insight("Async writes need a lock")
+        result = await memory.recall("Why did we choose SQLite?")
+        assert "[DECISION] Using SQLite" in result
+        context = await memory.get_task_context("sqlite storage")
+        assert context.startswith("[Memory Context]")
+
+    @pytest.mark.asyncio
+    async def test_task_context_token_budget(self):
+        """Test task context is trimmed with the layer's tokenizer."""
+        memory = NeuralMemoryLayer("test-project", in_memory=True, tokenizer=_WordTokenizer())
+        await memory.store_context("sqlite " + "storage " * 50)
+        context = await memory.get_task_context("sqlite storage", max_tokens_approx=10)
+        inner = context.removeprefix("[Memory Context] ").removesuffix(" [/Memory Context]")
+        assert 0 < len(inner.split()) <= 10
+
+
+class TestSessionCompressor:
+    """Tests for token-aware rolling session compression."""
+
+    def setup_method(self):
+        self.prompts = []
+
+    async def _llm(self, prompt):
+        self.prompts.append(prompt)
+        return f"summary {len(self.prompts)}"
+
+    def _compressor(self, **kwargs):
+        memory = NeuralMemoryLayer("test-project", in_memory=True)
+        return SessionCompressor(memory, self._llm, **kwargs)
+
+    @pytest.mark.asyncio
+    async def test_many_short_messages_not_compressed(self):
+        """Test many short messages stay under the token threshold."""
+        compressor = self._compressor()
+        messages = [{"role": "user", "content": "ok"}] * 30
+        assert await compressor.maybe_compress(messages) is messages
+        assert self.prompts == []
+
+    @pytest.mark.asyncio
+    async def test_few_large_messages_compressed(self):
+        """Test a few huge messages trigger compression and keep recent tokens."""
+        compressor = self._compressor(compress_threshold_tokens=1000, recent_tokens=300)
+        messages = [{"role": "tool", "content": "x" * 2000} for _ in range(3)]
+        messages.append({"role": "user", "content": "What next?"})
+        result = await compressor.maybe_compress(messages)
+        assert result == messages[-1:]
+        assert len(self.prompts) == 1
+        recalled = await compressor.memory.recall("summary")
+        assert "[SESSION_SUMMARY] summary 1" in recalled
+
+    @pytest.mark.asyncio
+    async def test_rolling_summary_and_input_cap(self):
+        """Test later compressions fold only new messages into the previous summary."""
+        compressor = self._compressor(
+            compress_threshold_tokens=100, recent_tokens=50, max_summary_input_tokens=300
+        )
+        old = [{"role": "user", "content": "first topic " * 50}]
+        new = [{"role": "user", "content": "second topic " * 50}]
+        recent = [{"role": "user", "content": "latest"}]
+
+        await compressor.maybe_compress(old + recent)
+        await compressor.maybe_compress(new + recent)
+
+        assert "Previous summary: summary 1" in self.prompts[1]
+        assert "second topic" in self.prompts[1]
+        assert "first topic" not in self.prompts[1]
+        tokenizer = compressor.tokenizer
+        assert all(tokenizer.count(p) < 300 + 150 for p in self.prompts)  # cap + template
+
+    @pytest.mark.asyncio
+    async def test_typed_extraction_single_batch(self):
+        """Test decisions/insights/facts are stored as typed memories in one batch."""
+        async def llm(prompt):
+            return (
+                "SUMMARY: Set up storage layer.\n"
+                "DECISION: Use SQLite WAL mode | concurrent readers\n"
+                "- INSIGHT: Async writes need a lock\n"
+                "FACT: Database lives in .openclaw\n"
+                "FACT: Database lives in .openclaw\n"
+            )
+
+        memory = NeuralMemoryLayer("test-project", in_memory=True)
+        batches = []
+        store_many = memory.store_many
+
+        async def tracking_store_many(records):
+            batches.append(records)
+            await store_many(records)
+
+        memory.store_many = tracking_store_many
+        compressor = SessionCompressor(
+            memory, llm, compress_threshold_tokens=100, recent_tokens=10, ttl_hours={"fact": 1}
+        )
+        messages = [{"role": "user", "content": "storage " * 200}, {"role": "user", "content": "hi"}]
+        await compressor.maybe_compress(messages)
+
+        assert len(batches) == 1
+        by_type = {r.memory_type: r for r in batches[0]}
+        assert sorted(r.memory_type for r in batches[0]) == ["context", "decision", "fact", "insight"]
+        assert by_type["decision"].content == "[DECISION] Use SQLite WAL mode | Context: concurrent readers"
+        assert by_type["decision"].expires_hours is None
+        assert by_type["fact"].expires_hours == 1
+        assert by_type["context"].content == "[SESSION_SUMMARY] Set up storage layer."
+        assert compressor.summary == "Set up storage layer."
+        assert "[DECISION] Use SQLite" in await memory.recall("SQLite WAL mode decision")
+
+    @pytest.mark.asyncio
+    async def test_summary_cache_skips_repeat_segments(self, tmp_path):
+        """Test identical segments are answered from the persistent summary cache."""
+        messages = [{"role": "user", "content": "delta " * 200}, {"role": "user", "content": "hi"}]
+        db_path = str(tmp_path / "summaries.db")
+
+        compressor = self._compressor(
+            compress_threshold_tokens=100, recent_tokens=10, summary_cache=SummaryCache(db_path)
+        )
+        await compressor.maybe_compress(messages)
+        await compressor.close()
+        assert len(self.prompts) == 1
+
+        # Fresh process (new compressor, same cache file): no LLM call
+        cache = SummaryCache(db_path)
+        compressor = self._compressor(
+            compress_threshold_tokens=100, recent_tokens=10, summary_cache=cache
+        )
+        await compressor.maybe_compress(messages)
+        assert len(self.prompts) == 1
+        assert compressor.summary == "summary 1"
+        assert cache.hits == 1 and cache.misses == 0
+
+    def test_summary_cache_eviction(self, tmp_path):
+        """Test the on-disk cache is bounded, evicting least recently used."""
+        cache = SummaryCache(str(tmp_path / "summaries.db"), max_entries=2, memory_entries=1)
+        cache.put("a", "A")
+        cache.put("b", "B")
+        assert cache.get("a") == "A"  # refreshes a
+        cache.put("c", "C")
+        assert len(cache) == 2
+        assert cache.get("b") is None
+        assert cache.get("a") == "A" and cache.get("c") == "C"
+        assert cache.misses == 1 and cache.hits == 3
+
+    def test_summary_cache_lru_hits_refresh_disk_recency(self, tmp_path):
+        """Test hits served from the LRU tier still protect entries from disk eviction."""
+        db_path = str(tmp_path / "summaries.db")
+        cache = SummaryCache(db_path, max_entries=2, memory_entries=2)
+        cache.put("a", "A")
+        cache.put("b", "B")
+        assert cache.get("a") == "A"  # LRU tier hit
+        cache.put("c", "C")
+        cache.close()
+
+        reopened = SummaryCache(db_path, max_entries=2, memory_entries=0)
+        assert reopened.get("b") is None
+        assert reopened.get("a") == "A" and reopened.get("c") == "C"
+        reopened.close()
+
+    @pytest.mark.asyncio
+    async def test_map_reduce_long_segment(self):
+        """Test long segments are chunked, summarized concurrently and memoized."""
+        active, peak = 0, 0
+
+        async def llm(prompt):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return await self._llm(prompt)
+
+        memory = NeuralMemoryLayer("test-project", in_memory=True)
+        compressor = SessionCompressor(
+            memory, llm, compress_threshold_tokens=500, recent_tokens=10,
+            max_summary_input_tokens=400, chunk_tokens=200, max_concurrency=3,
+        )
+        messages = [{"role": "user", "content": f"topic {i} " + "x" * 600} for i in range(8)]
+        messages.append({"role": "user", "content": "latest"})
+
+        await compressor.maybe_compress(messages)
+        chunk_prompts = [p for p in self.prompts if "part of a longer conversation" in p]
+        assert len(chunk_prompts) == 8
+        assert 1 < peak <= 3
+        final = self.prompts[-1]
+        assert "summary 1" in final and "topic" not in final
+
+        # Same segment again (e.g. retry): chunk summaries come from the memo
+        compressor.reset()
+        calls = len(self.prompts)
+        await compressor.maybe_compress(messages)
+        assert len(self.prompts) == calls + 1
+
+    @pytest.mark.asyncio
+    async def test_background_returns_immediately(self):
+        """Test background mode trims at once and coalesces triggers into one summary."""
+        release = asyncio.Event()
+
+        async def slow_llm(prompt):
+            await release.wait()
+            return await self._llm(prompt)
+
+        memory = NeuralMemoryLayer("test-project", in_memory=True)
+        compressor = SessionCompressor(
+            memory, slow_llm, compress_threshold_tokens=100, recent_tokens=10, background=True
+        )
+        first = [{"role": "user", "content": "alpha " * 100}, {"role": "user", "content": "hi"}]
+        second = [{"role": "user", "content": "beta " * 100}, {"role": "user", "content": "hi"}]
+
+        assert await compressor.maybe_compress(first) == first[-1:]
+        await asyncio.sleep(0)  # worker takes the first batch
+        assert await compressor.maybe_compress(second) == second[-1:]
+        assert compressor.pending == 1  # queued behind the running summary
+
+        release.set()
+        await compressor.flush()
+        assert compressor.pending == 0
+        assert len(self.prompts) == 2
+        assert "Previous summary: summary 1" in self.prompts[1]
+
+    @pytest.mark.asyncio
+    async def test_background_retry_keeps_messages(self):
+        """Test failed background summaries keep messages queued for a retry."""
+        failures = []
+
+        async def flaky_llm(prompt):
+            if len(failures) < 2:
+                failures.append(prompt)
+                raise RuntimeError("LLM unavailable")
+            return await self._llm(prompt)
+
+        memory = NeuralMemoryLayer("test-project", in_memory=True)
+        compressor = SessionCompressor(
+            memory, flaky_llm, compress_threshold_tokens=100, recent_tokens=10,
+            background=True, max_retries=2, retry_delay=0,
+        )
+        messages = [{"role": "user", "content": "gamma " * 100}, {"role": "user", "content": "hi"}]
+        await compressor.maybe_compress(messages)
+        await compressor.flush()
+        assert compressor.pending == 1  # gave up after max_retries, nothing lost
+
+        await compressor.flush()
+        assert compressor.pending == 0
+        assert "gamma" in self.prompts[0]
+
+
+class TestWriteBuffer:
+    """Tests for batched memory writes."""
+
+    def setup_method(self):
+        self.batches = []
+
+    async def _flush(self, records):
+        self.batches.append(list(records))
+
+    @pytest.mark.asyncio
+    async def test_flush_on_size(self):
+        """Test buffer flushes one batch when size threshold is reached."""
+        buffer = WriteBuffer(self._flush, max_items=3, max_delay_seconds=60)
+        for i in range(3):
+            await buffer.add(MemoryRecord.fact(f"fact {i}"))
+        assert len(self.batches) == 1
+        assert len(self.batches[0]) == 3
+        assert len(buffer) == 0
+
+    @pytest.mark.asyncio
+    async def test_flush_on_time(self):
+        """Test buffer flushes pending records after the delay."""
+        buffer = WriteBuffer(self._flush, max_items=100, max_delay_seconds=0.01)
+        await buffer.add(MemoryRecord.insight("slow burst"))
+        await asyncio.sleep(0.05)
+        assert [r.content for r in self.batches[0]] == ["[INSIGHT] slow burst"]
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_records(self):
+        """Test records are kept for retry when a flush fails."""
+        async def failing(records):
+            raise RuntimeError("disk full")
+
+        buffer = WriteBuffer(failing, max_items=100)
+        await buffer.add(MemoryRecord.decision("Use SQLite", "portable"))
+        with pytest.raises(RuntimeError):
+            await buffer.flush()
+        assert len(buffer) == 1
+        buffer._flush_fn = self._flush
+        await buffer.close()
+        assert self.batches[0][0].content == "[DECISION] Use SQLite | Context: portable"
+
+    @pytest.mark.asyncio
+    async def test_failed_timed_flush_retries_without_add(self):
+        """Test a failed timed flush is retried on its own, with backoff."""
+        failures = []
+
+        async def flaky(records):
+            if not failures:
+                failures.append(1)
+                raise RuntimeError("database is locked")
+            await self._flush(records)
+
+        buffer = WriteBuffer(flaky, max_items=100, max_delay_seconds=0.01)
+        await buffer.add(MemoryRecord.fact("quiet gateway"))
+        await asyncio.sleep(0.1)
+        assert failures == [1]
+        assert [r.content for r in self.batches[0]] == ["quiet gateway"]
+        assert len(buffer) == 0
+
+    @pytest.mark.asyncio
+    async def test_layer_store_many_buffered(self):
+        """Test buffered layer flushes store_many and store_* together."""
+        memory = NeuralMemoryLayer("test-project", write_buffer_size=10)
+        await memory.store_many([MemoryRecord.fact("a"), MemoryRecord.context("b")])
+        await memory.store_decision("c")
+        assert await memory.flush() == 3
+        assert await memory.flush() == 0
+        await memory.close()
+
+
+class TestWriteBehindQueue:
+    """Tests for background write-behind persistence."""
+
+    def setup_method(self):
+        self.written = []
+
+    async def _write(self, records):
+        await asyncio.sleep(0)
+        self.written.extend(r.content for r in records)
+
+    @pytest.mark.asyncio
+    async def test_submit_returns_before_write(self):
+        """Test submit does not wait for the write."""
+        queue = WriteBehindQueue(self._write, workers=2)
+        await queue.submit(MemoryRecord.fact("a"))
+        assert self.written == []
+        await queue.close()
+        assert self.written == ["a"]
+
+    @pytest.mark.asyncio
+    async def test_spill_when_full(self, tmp_path):
+        """Test overflow is spilled to disk and written on join."""
+        spill = tmp_path / "memory.db.spill.jsonl"
+        queue = WriteBehindQueue(self._write, max_queue=2, workers=1, spill_path=str(spill))
+        for i in range(5):
+            await queue.submit(MemoryRecord.fact(f"fact {i}"))
+        assert spill.exists()
+        await queue.close()
+        assert sorted(self.written) == [f"fact {i}" for i in range(5)]
+        assert not spill.exists()
+
+    @pytest.mark.asyncio
+    async def test_spill_is_capped(self, tmp_path):
+        """Test submit waits for queue space once the spill file is full."""
+        spill = tmp_path / "memory.db.spill.jsonl"
+        queue = WriteBehindQueue(
+            self._write, max_queue=2, workers=1, spill_path=str(spill), max_spill=2
+        )
+        for i in range(8):
+            await queue.submit(MemoryRecord.fact(f"fact {i}"))
+        assert len(spill.read_text().splitlines()) <= 2
+        await queue.close()
+        assert sorted(self.written) == [f"fact {i}" for i in range(8)]
+
+    def test_in_memory_layer_does_not_spill(self, tmp_path):
+        """Test in-memory layers apply backpressure instead of writing a spill file."""
+        memory = NeuralMemoryLayer(
+            "test-project", db_path=str(tmp_path / "m.db"), write_behind=True, in_memory=True
+        )
+        assert memory._write_behind.spill_path is None
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_is_spilled(self, tmp_path):
+        """Test a failed batch is kept on disk instead of lost."""
+        async def failing(records):
+            raise RuntimeError("locked")
+
+        spill = tmp_path / "spill.jsonl"
+        queue = WriteBehindQueue(failing, workers=1, spill_path=str(spill), retry_delay=0)
+        await queue.submit(MemoryRecord.insight("keep me"))
+        await queue.close()
+        assert "[INSIGHT] keep me" in spill.read_text()
+
+    @pytest.mark.asyncio
+    async def test_layer_read_your_writes(self, tmp_path):
+        """Test cached tool results are readable before background persistence."""
+        memory = NeuralMemoryLayer("test-project", db_path=str(tmp_path / "m.db"), write_behind=True)
+        await memory.cache_tool_result("read_file", {"path": "a.py"}, "content")
+        assert await memory.get_cached_tool_result("read_file", {"path": "a.py"}) == "content"
+        await memory.close()
+
+
+class TestRecallCache:
+    """Tests for the recall result cache."""
+
+    def test_normalized_hit(self):
+        """Test near-identical queries share one entry."""
+        cache = RecallCache()
+        cache.put("Implement  Feature X ", 2, "ctx")
+        assert cache.get("implement feature x", 2) == (True, "ctx")
+        assert cache.get("implement feature x", 3) == (False, None)
+
+    def test_generation_invalidation(self):
+        """Test writes and in-flight stale puts invalidate entries."""
+        cache = RecallCache()
+        cache.put("q", 2, "old")
+        cache.invalidate()
+        assert cache.get("q", 2) == (False, None)
+        cache.put("q", 2, "stale", generation=cache.generation - 1)
+        assert cache.get("q", 2) == (False, None)
+
+    def test_ttl_and_lru(self):
+        """Test TTL expiry and LRU bound."""
+        cache = RecallCache(max_entries=1, ttl_seconds=0)
+        cache.put("a", 2, "A")
+        cache.put("b", 2, "B")
+        assert len(cache) == 1
+        assert cache.get("b", 2) == (False, None)
+
+    @pytest.mark.asyncio
+    async def test_layer_recall_memoized_until_write(self):
+        """Test repeated recall skips the pipeline until a store_* call."""
+        memory, backend = await _layer_with_fake_backend()
+        await memory.store_decision("Use SQLite")
+        assert await memory.recall("why sqlite") == await memory.recall("Why  SQLite")
+        assert backend.queries == 1
+        await memory.store_insight("SQLite WAL mode helps")
+        assert "WAL" in await memory.recall("why sqlite")
+        assert backend.queries == 2
+
+    @pytest.mark.asyncio
+    async def test_recall_many_dedupes_and_bounds(self):
+        """Test recall_many keeps order, dedupes and bounds concurrency."""
+        memory, backend = await _layer_with_fake_backend(recall_cache_size=0)
+        await memory.store_decision("Use SQLite")
+        await memory.store_insight("WAL mode helps")
+        results = await memory.recall_many(
+            ["sqlite", "wal", "SQLite ", "nothing", "a1", "a2", "a3"],
+            max_concurrency=2,
+        )
+        assert "SQLite" in results[0] and "WAL" not in results[0]
+        assert "WAL" in results[1]
+        assert results[2] == results[0]
+        assert results[3] is None
+        assert backend.queries == 6
+        assert backend.max_in_flight == 2
+
+    @pytest.mark.asyncio
+    async def test_recall_many_rejects_bad_concurrency(self):
+        """Test max_concurrency below 1 raises instead of hanging."""
+        memory = NeuralMemoryLayer("test-project")
+        with pytest.raises(ValueError):
+            await memory.recall_many(["sqlite"], max_concurrency=0)
+
+
+class TestSingleFlight:
+    """Tests for single-flight deduplication."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_flight(self):
+        """Test concurrent identical keys run the function once."""
+        flight = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "result"
+
+        results = await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+        assert results == ["result"] * 5
+        assert len(calls) == 1
+        assert flight.in_flight() == 0
+
+    @pytest.mark.asyncio
+    async def test_errors_propagate_to_all_waiters(self):
+        """Test an exception reaches every waiter and is not cached."""
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("rate limited")
+
+        results = await asyncio.gather(
+            flight.do("k", fail), flight.do("k", fail), return_exceptions=True
+        )
+        assert all(isinstance(r, ValueError) for r in results)
+
+        async def ok():
+            return "ok"
+
+        assert await flight.do("k", ok) == "ok"
+
+    @pytest.mark.asyncio
+    async def test_cancelled_leader_does_not_cancel_followers(self):
+        """Test followers still get the result when the first caller is cancelled."""
+        flight = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.02)
+            return "result"
+
+        leader = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        assert await follower == "result"
+        assert leader.cancelled()
+        assert len(calls) == 1
+        assert flight.in_flight() == 0
+
+    @pytest.mark.asyncio
+    async def test_call_cancelled_when_every_caller_gives_up(self):
+        """Test the shared call is cancelled once no caller waits on it."""
+        flight = SingleFlight()
+        started = asyncio.Event()
+        cancelled = []
+
+        async def work():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(1)
+                raise
+
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(flight.do("k", work), timeout=0.01)
+        await asyncio.sleep(0)
+        assert started.is_set() and cancelled == [1]
+        assert flight.in_flight() == 0
+
+    @pytest.mark.asyncio
+    async def test_layer_get_or_call_tool(self):
+        """Test parallel identical tool calls cost one real call."""
+        memory = NeuralMemoryLayer("test-project")
+        calls = []
+
+        async def search():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "results"
+
+        results = await asyncio.gather(
+            *(memory.get_or_call_tool("search_web", {"q": "x"}, search) for _ in range(4))
+        )
+        assert results == ["results"] * 4
+        assert await memory.get_or_call_tool("search_web", {"q": "x"}, search) == "results"
+        assert len(calls) == 1
+
+
+class TestGarbageCollection:
+    """Tests for expired-memory GC and compaction."""
+
+    @pytest.mark.asyncio
+    async def test_collect_garbage_in_batches(self):
+        """Test expired memories are purged in bounded batches."""
+        memory = NeuralMemoryLayer("test-project", in_memory=True)
+        for i in range(5):
+            await memory.store_fact(f"expired fact {i}", expires_hours=-1)
+        await memory.store_fact("permanent fact")
+        await memory.cache_tool_result("read_file", {"path": "a"}, "A", ttl_seconds=0.01)
+        await asyncio.sleep(0.02)
+
+        stats = await memory.collect_garbage(batch_size=2, max_batches=2)
+        assert stats.memories_deleted == 4
+        assert stats.batches == 2
+        assert stats.tool_cache_deleted == 1
+
+        stats = await memory.collect_garbage(batch_size=2, max_batches=2)
+        assert stats.memories_deleted == 2  # 1 expired fact + 1 expired tool cache memory
+        assert memory.gc_totals.memories_deleted == 6
+        assert "permanent" in await memory.recall("permanent fact")
+
+    def test_tool_cache_purge_sqlite(self, tmp_path):
+        """Test expired rows are deleted from the persistent tier."""
+        cache = ToolResultCache(db_path=str(tmp_path / "m.db"))
+        cache.put("old", "read_file", "x", ttl_seconds=-1)
+        cache.put("new", "read_file", "y", ttl_seconds=3600)
+        assert cache.purge_expired() == 1
+        assert cache.get("new") == "y"
+        cache.close()
+
+    def test_vacuum_reclaims_space(self, tmp_path):
+        """Test vacuum shrinks the DB file after deletes."""
+        import sqlite3
+
+        db_path = str(tmp_path / "m.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE t (v TEXT)")
+        conn.executemany("INSERT INTO t VALUES (?)", [("x" * 1000,)] * 500)
+        conn.commit()
+        conn.execute("DELETE FROM t")
+        conn.commit()
+        conn.close()
+
+        size_before = Path(db_path).stat().st_size
+        vacuum_database(db_path)
+        assert Path(db_path).stat().st_size < size_before
+        vacuum_database(db_path)  # Second run is incremental
+
+
+class TestNeuralMemoryPool:
+    """Tests for pooling layers across projects."""
+
+    @pytest.mark.asyncio
+    async def test_shared_layer_initialized_once(self):
+        """Test concurrent acquires share one initialized layer."""
+        pool = NeuralMemoryPool(in_memory=True)
+        layers = await asyncio.gather(*(pool.acquire("tenant-a") for _ in range(5)))
+        assert all(layer is layers[0] for layer in layers)
+        assert layers[0]._initialized is True
+        assert len(pool) == 1
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_cap_evicts_least_recently_used_idle(self):
+        """Test opening beyond max_open closes the LRU idle layer."""
+        pool = NeuralMemoryPool(max_open=2, in_memory=True)
+        async with pool.lease("a") as layer_a:
+            await layer_a.store_fact("tenant a fact")
+        async with pool.lease("b"):
+            pass
+        async with pool.lease("c"):
+            pass
+        assert len(pool) == 2
+        assert layer_a._initialized is False  # Closed; next acquire re-opens
+        reopened = await pool.acquire("a")
+        assert reopened._initialized is True
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_waits_for_release_when_all_in_use(self):
+        """Test acquire waits when every open layer is leased."""
+        pool = NeuralMemoryPool(max_open=1, in_memory=True)
+        layer_a = await pool.acquire("a")
+        waiter = asyncio.create_task(pool.acquire("b"))
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        await pool.release(layer_a)
+        layer_b = await asyncio.wait_for(waiter, 1)
+        assert layer_b.project_name == "b"
+        assert len(pool) == 1
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_opening_layer_is_not_evicted(self, monkeypatch):
+        """Test a layer still initializing is never picked as the eviction victim."""
+        initialize = NeuralMemoryLayer.initialize
+
+        async def slow_initialize(layer):
+            await asyncio.sleep(0.01)
+            await initialize(layer)
+
+        monkeypatch.setattr(NeuralMemoryLayer, "initialize", slow_initialize)
+        pool = NeuralMemoryPool(max_open=1, in_memory=True)
+        acquire_b = asyncio.create_task(pool.acquire("b"))
+        await asyncio.sleep(0)
+        acquire_c = asyncio.create_task(pool.acquire("c"))
+        layer_b = await acquire_b
+        assert not acquire_c.done()  # Waits for b, does not evict it mid-open
+        await pool.release(layer_b)
+        layer_c = await asyncio.wait_for(acquire_c, 1)
+        assert layer_b._initialized is False
+        assert len(pool) == 1 and layer_c._initialized is True
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_evict_idle(self):
+        """Test idle layers are closed after idle_seconds."""
+        pool = NeuralMemoryPool(idle_seconds=0, in_memory=True)
+        async with pool.lease("a"):
+            assert await pool.evict_idle() == 0  # In use
+        assert await pool.evict_idle() == 1
+        assert len(pool) == 0
 
 
 class TestCLI:
@@ -209,3 +1541,130 @@ class TestCLI:
         )
         assert result.returncode == 0
         assert "Decision stored" in result.stdout
+
+    def test_cli_gc(self):
+        """Test CLI gc command."""
+        import subprocess
+        result = subprocess.run(
+            ["python3", "nocl.py", "--project", "test-cli", "gc", "--vacuum"],
+            capture_output=True,
+            text=True,
+            cwd=Path(__file__).parent.parent
+        )
+        assert result.returncode == 0
+        assert "Expired memories deleted" in result.stdout
+
+
+class TestInMemoryBackend:
+    """Tests for the pure-Python in-memory backend."""
+
+    @pytest.mark.asyncio
+    async def test_keyword_recall_and_confidence(self):
+        """Test inverted-index recall ranks the best match first."""
+        backend = InMemoryBackend()
+        await backend.encode("[DECISION] Use SQLite for episodic memory", memory_type="decision")
+        await backend.encode("[INSIGHT] Redis was too heavy", memory_type="insight")
+        result = await backend.query("sqlite episodic memory")
+        assert result.memories[0].memory_type == "decision"
+        assert result.confidence == 1.0
+        assert await backend.query("kubernetes") is None
+
+    @pytest.mark.asyncio
+    async def test_expired_memories_are_skipped_and_purged(self):
+        """Test expired memories are not recalled and can be purged."""
+        backend = InMemoryBackend()
+        await backend.encode("stale context", memory_type="context", expires=-1)
+        await backend.encode("fresh context", memory_type="context", expires=1)
+        result = await backend.query("context")
+        assert result.context == "fresh context"
+        await backend.encode("another stale", memory_type="fact", expires=-1)
+        assert backend.purge_expired() == 1
+        assert len(backend) == 1
+
+
+class TestToolResultCache:
+    """Tests for the exact-match tool result cache."""
+
+    def test_lru_hit_and_eviction(self):
+        """Test LRU tier serves hits and evicts least recently used."""
+        cache = ToolResultCache(max_entries=2)
+        cache.put("a", "read_file", "A")
+        cache.put("b", "read_file", "B")
+        assert cache.get("a") == "A"  # "a" becomes most recent
+        cache.put("c", "read_file", "C")
+        assert cache.get("b") is None
+        assert cache.get("a") == "A"
+        assert cache.get("c") == "C"
+
+    def test_expired_entry_is_miss(self):
+        """Test expired entries are treated as misses."""
+        cache = ToolResultCache()
+        cache.put("k", "read_file", "value", ttl_seconds=-1)
+        assert cache.get("k") is None
+
+    def test_sqlite_tier_persists(self, tmp_path):
+        """Test persistent tier survives a new cache instance."""
+        db_path = str(tmp_path / "memory.db")
+        cache = ToolResultCache(db_path=db_path)
+        cache.put("k", "read_file", "persisted", ttl_seconds=3600)
+        cache.close()
+
+        reopened = ToolResultCache(db_path=db_path)
+        assert reopened.get("k") == "persisted"
+        reopened.close()
+
+    def test_sqlite_errors_do_not_fail_caller(self, tmp_path):
+        """Test a locked persistent tier is logged and the LRU tier still serves."""
+        import sqlite3
+
+        db_path = str(tmp_path / "memory.db")
+        cache = ToolResultCache(db_path=db_path)
+        cache.get("warm-up")  # Create the table
+        locker = sqlite3.connect(db_path)
+        locker.execute("BEGIN EXCLUSIVE")
+        try:
+            cache.put("k", "read_file", "value", ttl_seconds=3600)
+            assert cache.get("k") == "value"
+            cache.invalidate("k")
+            assert cache.get("other") is None
+        finally:
+            locker.rollback()
+            locker.close()
+            cache.close()
+
+    @pytest.mark.asyncio
+    async def test_layer_exact_hit(self):
+        """Test repeat lookup is served from the exact index."""
+        memory = NeuralMemoryLayer("test-project")
+        await memory.cache_tool_result("read_file", {"path": "a.py"}, "print('a')")
+        cached = await memory.get_cached_tool_result("read_file", {"path": "a.py"})
+        assert cached == "print('a')"
+        assert await memory.get_cached_tool_result("read_file", {"path": "b.py"}) is None
+
+    @pytest.mark.asyncio
+    async def test_zero_ttl_is_not_stored(self):
+        """Test a TTL of 0 means "do not cache", not "never expires"."""
+        memory = NeuralMemoryLayer("test-project")
+        await memory.cache_tool_result("git_status", {}, "clean", ttl_hours=0)
+        assert await memory.get_cached_tool_result("git_status", {}) is None
+
+        cache = ToolResultCache()
+        cache.put("k", "git_status", "clean", ttl_seconds=0)
+        assert cache.get("k") is None
+
+    @pytest.mark.asyncio
+    async def test_exact_hit_returns_full_result(self):
+        """Test the exact index keeps results longer than max_result_chars."""
+        memory = NeuralMemoryLayer("test-project")
+        content = "x" * 2000
+        await memory.cache_tool_result("read_file", {"path": "big.py"}, content, max_result_chars=500)
+        assert await memory.get_cached_tool_result("read_file", {"path": "big.py"}) == content
+
+    @pytest.mark.asyncio
+    async def test_semantic_hit_returns_bare_result(self):
+        """Test the semantic fallback strips the [TOOL_CACHE] memory prefix."""
+        memory, backend = await _layer_with_fake_backend()
+        memory.in_memory = False
+        backend.encoded.append('[TOOL_CACHE] read_file({"path":"a.py"}) → print(1)')
+        cached = await memory.get_cached_tool_result("read_file", {"path": "b.py"})
+        assert cached == "print(1)"